@@ -1,35 +1,63 @@
-import os
-import subprocess
-import sys
-
-# Install plotly if not already installed
-try:
-    import plotly
-except ImportError:
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "plotly"])
-
+import streamlit as st
 
-# import subprocess
-# import sys
+from observatory.debug import finish_page
+from observatory.preload import start_preload
+from observatory.tracing import stage, start_run
 
-import pandas as pd
-import streamlit as st
-import plotly.express as px
 
 
+start_run("app")
 
-# Load Dataset
-# Example: 'country' column for country names, other columns for years
-data = pd.read_csv("https://huggingface.co/spaces/jiyachachan/fp2/resolve/main/child_mortality_0_5_year_olds_dying_per_1000_born.csv")
+# Import pandas and open the shared store in the background while the title is sent
+start_preload()
 
-# Melt the data to long format for easier filtering
-data_melted = data.melt(id_vars=["country"], var_name="year", value_name="mortality_rate")
-data_melted["year"] = pd.to_numeric(data_melted["year"])
 # Streamlit App
 st.title("Global Child Mortality Rate (per 1000 children born)")
 st.write("By Jiya Chachan, Smeet Patel, Ji Eun Kim, Miloni Shah, Chenzhao Wang")
 st.write("Dataset: Child Mortality")
-st.dataframe(data) 
+
+# Load Dataset
+# Example: 'country' column for country names, other columns for years
+with stage("load"):
+    # Data modules are imported here, after the title, and wait for the preload
+    from observatory.charts import playback_toggle
+    from observatory.cube import get_cube
+    from observatory.figures import figure_cache
+    from observatory.panel import get_panel
+    from observatory.payload import (
+        format_bytes, lean_frame, lean_slice, page_count, payload_bytes, shared_payload_bytes, table_page,
+    )
+    from observatory.store import indicator_frame
+
+    # Read before any data is fetched; specs drawn from a store swapped out since are not cached
+    generation = figure_cache.generation
+    # Float64 values without float32 noise (91.6 rather than 91.5999984741211), shared between reruns
+    data = indicator_frame("child_mortality", widened=True)
+
+    # Year slices are served straight from the shared indicator cube
+    cube = get_cube()
+
+# Lean rendering sends ISO-3 codes, display-precision values and one page of the table
+lean = st.sidebar.checkbox("Lean rendering", value=True, help="Send a paginated table and an ISO-3 keyed map")
+if lean:
+    rows_per_page = 25
+    year_columns = list(data.columns)
+    table_controls = st.columns(2)
+    table_page_number = table_controls[0].number_input(
+        "Table page", min_value=1, max_value=page_count(data, rows_per_page), value=1
+    )
+    first_table_year = table_controls[1].select_slider(
+        "Table years from", options=year_columns[::25], value="2000"
+    )
+    start = year_columns.index(first_table_year)
+    with stage("filter"):
+        table = table_page(data, table_page_number, rows_per_page, year_columns[start:start + 25], "child_mortality")
+    table_bytes = payload_bytes(table)
+else:
+    table = data
+    table_bytes = shared_payload_bytes(table)
+with stage("render"):
+    st.dataframe(table) 
 st.write("""Credits: https://www.gapminder.org/data/""")
 
 st.write("""The following interactive visualization provides an insightful overview of child mortality rates (number of deaths per 1,000 live births) across countries for a selected year. 
@@ -38,8 +66,7 @@ st.write("""The following interactive visualization provides an insightful overv
 # years = sorted(data_melted["year"].unique())  # Extract unique years from the dataset
 # selected_year = st.selectbox("Select Year", years)
 # Add year selection with a slider
-min_year = int(data_melted["year"].min())
-max_year = int(data_melted["year"].max())
+min_year, max_year = cube.year_span(["child_mortality"])
 
 st.subheader("Child Mortality Trends around the Globe")
 st.write("""
@@ -49,26 +76,96 @@ We can utilise the trends in the graph to understand the factors which might be
 This will help the policymakers in developing/under-developed countries to develop data-driven policy to reduce child mortality.
 """)
 
-selected_year = st.slider("Select Year", min_value=min_year, max_value=max_year, value = 2024, step = 5)
-
-
-# Filter data for the selected year
-filtered_data = data_melted[data_melted["year"] == selected_year]
-
-
-# Create the map
-fig = px.choropleth(
-    filtered_data,
-    locations="country",  # Country names or ISO 3166-1 Alpha-3 codes
-    locationmode="country names",  # Use 'ISO-3' if you have country codes
-    color="mortality_rate",
-    title=f"Child Mortality Rate in {selected_year}",
-    color_continuous_scale=px.colors.sequential.OrRd,  # Customize the color scale
-    
-)
-
-# Display the map
-st.plotly_chart(fig)
+# Playback sends every year once as animation frames of the map
+play = playback_toggle()
+if not play:
+    selected_year = st.slider("Select Year", min_value=min_year, max_value=max_year, value = 2024, step = 5)
+
+
+def build_choropleth(year, lean):
+    # Plotly Express is only imported once a map actually has to be built
+    import plotly.express as px
+
+    # Filter data for the selected year
+    with stage("filter"):
+        mortality = cube.year_slice("child_mortality", year)
+        if lean:
+            filtered_data = lean_slice(mortality, "child_mortality", "mortality_rate")
+            locations, locationmode = "iso_alpha", "ISO-3"
+        else:
+            filtered_data = mortality.rename("mortality_rate").reset_index()
+            locations, locationmode = "country", "country names"
+
+    # Create the map
+    with stage("chart"):
+        return px.choropleth(
+            filtered_data,
+            locations=locations,  # Country names or ISO 3166-1 Alpha-3 codes
+            locationmode=locationmode,
+            color="mortality_rate",
+            title=f"Child Mortality Rate in {year}",
+            color_continuous_scale=px.colors.sequential.OrRd,  # Customize the color scale
+        )
+
+
+def build_choropleth_animation(lean):
+    import plotly.express as px
+
+    # Every year in one pass over the store, sorted by year since Plotly orders frames by first appearance
+    with stage("filter"):
+        frames = get_panel().frame(["child_mortality"], dropna="any").sort_values("year", kind="stable")
+        if lean:
+            frames = lean_frame(frames, "child_mortality", "mortality_rate")
+            locations, locationmode = "iso_alpha", "ISO-3"
+        else:
+            frames = frames.rename(columns={"child_mortality": "mortality_rate"})
+            locations, locationmode = "country", "country names"
+
+    with stage("chart"):
+        fig = px.choropleth(
+            frames,
+            locations=locations,
+            locationmode=locationmode,
+            color="mortality_rate",
+            animation_frame="year",
+            range_color=(0, frames["mortality_rate"].max()),  # One color scale for every year
+            title="Child Mortality Rate by Year",
+            color_continuous_scale=px.colors.sequential.OrRd,
+        )
+        # Plotly's default of 500 ms per frame would take minutes for 300 years
+        play_args = fig.layout.updatemenus[0].buttons[0].args[1]
+        play_args["frame"]["duration"] = 100
+        play_args["transition"]["duration"] = 0
+        return fig
+
+
+if play:
+    map_page, map_state = "app/play", {"lean": lean}
+    fig = figure_cache.get_or_build(
+        map_page, map_state, lambda: build_choropleth_animation(lean),
+        depends={"indicators": ["child_mortality"]}, generation=generation,
+    )
+else:
+    # Maps are cached per year; with OBSERVATORY_PREWARM=1 every slider step is rendered in the background
+    map_page, map_state = "app", {"year": selected_year, "lean": lean}
+    fig = figure_cache.get_or_build(
+        map_page, map_state, lambda: build_choropleth(selected_year, lean),
+        depends={"indicators": ["child_mortality"], "years": [selected_year]}, generation=generation,
+    )
+    figure_cache.prewarm(
+        "app",
+        [{"year": year, "lean": lean} for year in range(min_year, max_year + 1, 5)],
+        lambda state: build_choropleth(state["year"], state["lean"]),
+        depends=lambda state: {"indicators": ["child_mortality"], "years": [state["year"]]},
+        generation=generation,
+    )
+
+# Display the map (Streamlit serializes the figure here)
+with stage("render"):
+    st.plotly_chart(fig)
+# Sizes come from the figure cache and a one-off measurement of the shared table, not a fresh serialization
+map_bytes = figure_cache.size(map_page, map_state, fig)
+st.caption(f"Sent for this view: table {format_bytes(table_bytes)}, map {format_bytes(map_bytes)}")
 
 st.write("""I began by acquiring a dataset on child mortality rates, with countries as rows and years as columns. The dataset contained child mortality rates as the number of deaths per 1,000 live births.
 To make the dataset suitable for visualization, I transformed it into a long format using pandas.melt(), creating three columns: country, year, and mortality_rate. This step allowed for efficient filtering and visualization.
@@ -76,5 +173,4 @@ I chose a choropleth map because it effectively communicates regional difference
 I implemented a slider widget for year selection, enabling users to dynamically explore mortality rates over time.
 This required ensuring that the year column was properly formatted as numeric data, and filtering the dataset based on the slider’s value.""")
 
-
-
+finish_page()
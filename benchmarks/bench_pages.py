@@ -0,0 +1,368 @@
+"""Headless timing and load test of the landing page and every page script.
+
+Each script is run with Streamlit's ``AppTest`` and driven through a sweep of
+realistic widget states: every step of the landing page year slider with lean
+rendering on and off, growing country selections and year ranges on the life
+expectancy page, a sample of countries on the population page, years by
+top-N 5-50 on the GDP page and years on the income page. By default every
+year slider step is visited; ``--year-step`` or ``--quick`` subsample the
+years for shorter runs. The ``*_play``
+entries load the same pages with year playback on, where one rerun sends
+every year, so their totals compare with a whole year sweep. For every
+interaction the wall time is recorded along with the seconds spent in each
+stage reported by ``observatory.tracing`` (``load``, ``filter``, ``chart``,
+``serialize``, ``render``; ``other`` is the remainder, mostly Streamlit's
+own script and delta handling). A second pass repeats the sweep under
+``tracemalloc`` to record peak memory per interaction.
+
+``--sessions N`` adds a concurrent pass in which N simulated users, each with
+their own ``AppTest`` session in a worker process, replay the sweeps at once.
+It reports throughput and latency percentiles, so raising N shows where
+throughput stops scaling.
+
+Results are written as JSON (commit, options and per-page figures) so runs on
+different commits can be compared, e.g. with ``--compare OLD.json``.
+
+Run from the repository root::
+
+    python benchmarks/bench_pages.py [--quick] [--year-step N] [--cold]
+        [--sessions N] [--skip-memory] [--output PATH] [--compare OLD.json]
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from observatory.charts import PLAY_LABEL  # noqa: E402
+from observatory.cube import get_cube  # noqa: E402
+from observatory.figures import figure_cache  # noqa: E402
+from observatory.panel import get_panel  # noqa: E402
+from observatory.tracing import add_listener, remove_listener  # noqa: E402
+
+PAGES = {
+    "app": "app.py",
+    "life_expectancy": "pages/1_Child%20Mortality%20VS%20Life%20Expectancy.py",
+    "population": "pages/2_Child%20Mortality%20Rate%20vs%20Population.py",
+    "gdp": "pages/3_Child%20Mortality%20VS%20GDP.py",
+    "income": "pages/Child%20Mortality%20Rate%20VS%20income.py",
+    "app_play": "app.py",
+    "gdp_play": "pages/3_Child%20Mortality%20VS%20GDP.py",
+    "income_play": "pages/Child%20Mortality%20Rate%20VS%20income.py",
+}
+STAGES = ("load", "filter", "chart", "serialize", "render")
+TIMEOUT = 120
+
+
+def sweeps(year_step, quick):
+    """Widget states to visit per page, as ``{widget label: value}`` dicts."""
+    cube = get_cube()
+    countries = list(get_panel().countries_with("child_mortality"))
+    default_countries = ["Argentina", "Australia", "China", "India", "South Africa", "UK", "USA"]
+
+    first, last = cube.year_span(["child_mortality"])
+    app_years = list(range(first, last + 1, max(5, year_step - year_step % 5)))
+    gdp_first, gdp_last = cube.year_span(["child_mortality", "gdp_per_capita"])
+    income_first = cube.year_span(["income", "child_mortality"])[0]
+
+    selections = [default_countries, countries[:25], countries[:50], countries]
+    ranges = [(1900, 2024), (1900, 1960), (1960, 2024), (2000, 2024)]
+    sample = countries[::max(1, len(countries) // (5 if quick else 20))]
+    top_n = [5, 30, 50] if quick else list(range(5, 51, 5))
+    if quick:
+        selections, ranges = selections[::3], ranges[:2]
+
+    return {
+        "app": [
+            {"Lean rendering": lean, "Select Year": year}
+            for lean in (True, False) for year in app_years
+        ],
+        "life_expectancy": [
+            {"Select Countries": selection, "Select Year Range": years}
+            for selection in selections for years in ranges
+        ],
+        "population": [{"Country": country} for country in sample],
+        "gdp": [
+            {"Select Year": year, "Select Number of Countries to Display": n}
+            for year in range(gdp_first, gdp_last + 1, year_step) for n in top_n
+        ],
+        "income": [{"Select a Year": year} for year in range(income_first, 2025, year_step)],
+        "app_play": [{"Lean rendering": lean, PLAY_LABEL: True} for lean in (True, False)],
+        "gdp_play": [
+            {PLAY_LABEL: True, "Select Number of Countries to Display": n} for n in top_n
+        ],
+        "income_play": [{PLAY_LABEL: True}],
+    }
+
+
+def set_widgets(at, state):
+    widgets = [*at.checkbox, *at.toggle, *at.slider, *at.select_slider, *at.multiselect, *at.selectbox, *at.number_input]
+    for label, value in state.items():
+        widget = next(w for w in widgets if w.label == label)
+        widget.set_value(value)
+
+
+class StageTotals:
+    """Listener summing stage seconds until the next ``take()``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def __call__(self, page, stage, seconds):
+        with self._lock:
+            self._totals[stage] = self._totals.get(stage, 0.0) + seconds
+
+    def take(self):
+        with self._lock:
+            totals, self._totals = self._totals, {}
+        return totals
+
+
+def run_once(at):
+    start = time.perf_counter()
+    at.run()
+    wall = time.perf_counter() - start
+    error = at.exception[0].value if at.exception else None
+    return wall, error
+
+
+def time_page(path, states, cold, totals):
+    """Time the first run and each interaction of one page."""
+    at = AppTest.from_file(os.path.join(ROOT, path), default_timeout=TIMEOUT)
+    totals.take()
+    first_run, error = run_once(at)
+    totals.take()
+    runs = []
+    for state in states:
+        if cold:
+            figure_cache.invalidate()
+        set_widgets(at, state)
+        wall, error = run_once(at)
+        stages = totals.take()
+        stages["other"] = max(0.0, wall - sum(stages.values()))
+        runs.append({"state": state, "wall_s": wall, "stages_s": stages, "error": error})
+    return first_run, runs
+
+
+def peak_memory(path, states, cold):
+    """Peak traced allocation in bytes for each interaction of one page."""
+    at = AppTest.from_file(os.path.join(ROOT, path), default_timeout=TIMEOUT)
+    tracemalloc.start()
+    try:
+        at.run()
+        peaks = []
+        for state in states:
+            if cold:
+                figure_cache.invalidate()
+            set_widgets(at, state)
+            tracemalloc.reset_peak()
+            at.run()
+            peaks.append(tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    values = np.asarray(values)
+    return {
+        "mean": float(values.mean()),
+        "p50": float(np.percentile(values, 50)),
+        "p90": float(np.percentile(values, 90)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(values.max()),
+    }
+
+
+def summarize(first_run, runs, peaks):
+    summary = {
+        "first_run_s": first_run,
+        "interactions": len(runs),
+        "errors": sum(run["error"] is not None for run in runs),
+        "wall_s": percentiles([run["wall_s"] for run in runs]),
+        "stages_mean_s": {
+            stage: float(np.mean([run["stages_s"].get(stage, 0.0) for run in runs]))
+            for stage in (*STAGES, "other")
+        } if runs else {},
+        "runs": runs,
+    }
+    if peaks is not None:
+        summary["peak_memory_bytes"] = max(peaks, default=0)
+        for run, peak in zip(runs, peaks):
+            run["peak_memory_bytes"] = peak
+    return summary
+
+
+def simulated_user(name, states, cold, barrier, results):
+    """One user replaying ``states`` on page ``name`` in a worker process."""
+    os.chdir(ROOT)
+    latencies, errors = [], []
+    started = finished = None
+    try:
+        at = AppTest.from_file(os.path.join(ROOT, PAGES[name]), default_timeout=TIMEOUT)
+        at.run()
+        barrier.wait(TIMEOUT)
+        started = time.time()
+        for state in states:
+            if cold:
+                figure_cache.invalidate()
+            set_widgets(at, state)
+            wall, error = run_once(at)
+            latencies.append(wall)
+            if error is not None:
+                errors.append(error)
+        finished = time.time()
+    except Exception as exc:
+        errors.append(repr(exc))
+        barrier.abort()
+    results.put((latencies, errors, started, finished))
+
+
+def concurrent(states, sessions, cold):
+    """Replay the sweeps with ``sessions`` simulated users at once.
+
+    ``AppTest`` installs its stand-in runtime process-wide, so each user gets
+    a worker process of its own, forked after the sequential pass so it starts
+    with the same warm caches. This matches running the app under several
+    server processes rather than as threads of one.
+    """
+    names = list(states)
+    # AppTest swaps out __main__ while scripts run, so spawned workers could not
+    # find their target by name
+    context = multiprocessing.get_context("fork")
+    barrier = context.Barrier(sessions)
+    results = context.Queue()
+    workers = []
+    for index in range(sessions):
+        # Users start on different pages so all scripts are exercised together
+        name = names[index % len(names)]
+        worker = context.Process(target=simulated_user, args=(name, states[name], cold, barrier, results),
+                                 name=f"user-{index}")
+        worker.start()
+        workers.append(worker)
+    outcomes = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    latencies = [wall for outcome in outcomes for wall in outcome[0]]
+    errors = [error for outcome in outcomes for error in outcome[1]]
+    starts = [outcome[2] for outcome in outcomes if outcome[2] is not None]
+    ends = [outcome[3] for outcome in outcomes if outcome[3] is not None]
+    elapsed = max(ends) - min(starts) if starts and ends else 0.0
+    return {
+        "sessions": sessions,
+        "interactions": len(latencies),
+        "errors": len(errors),
+        "first_errors": errors[:5],
+        "elapsed_s": elapsed,
+        "throughput_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_s": percentiles(latencies),
+    }
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def compare(result, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nagainst {baseline.get('commit', '?')[:10]} ({baseline_path})")
+    print(f"{'page':<18}{'p50 before':>12}{'p50 now':>10}{'change':>9}")
+    for name, page in result["pages"].items():
+        before = baseline.get("pages", {}).get(name, {}).get("wall_s", {}).get("p50")
+        now = page["wall_s"].get("p50")
+        if before and now:
+            print(f"{name:<18}{before * 1e3:>10.1f}ms{now * 1e3:>8.1f}ms{(now / before - 1) * 100:>+8.0f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="sample fewer widget states")
+    parser.add_argument("--year-step", type=int, default=None,
+                        help="years between swept slider values (default every step, 50 with --quick)")
+    parser.add_argument("--pages", nargs="+", choices=list(PAGES), default=list(PAGES))
+    parser.add_argument("--cold", action="store_true", help="clear the figure cache before every interaction")
+    parser.add_argument("--sessions", type=int, default=0, help="simulated concurrent users (0 to skip)")
+    parser.add_argument("--skip-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--output", help="JSON path (default benchmarks/results/pages-<commit>-<time>.json)")
+    parser.add_argument("--compare", metavar="OLD.json", help="print p50 changes against an earlier result")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    year_step = args.year_step or (50 if args.quick else 1)
+    states = {name: states for name, states in sweeps(year_step, args.quick).items() if name in args.pages}
+
+    totals = StageTotals()
+    add_listener(totals)
+    pages = {}
+    print(f"{'page':<18}{'runs':>6}{'first ms':>10}{'p50 ms':>9}{'p90 ms':>9}"
+          + "".join(f"{stage:>10}" for stage in (*STAGES, "other")) + f"{'peak MB':>9}")
+    try:
+        for name, page_states in states.items():
+            first_run, runs = time_page(PAGES[name], page_states, args.cold, totals)
+            peaks = None if args.skip_memory else peak_memory(PAGES[name], page_states, args.cold)
+            page = pages[name] = summarize(first_run, runs, peaks)
+            peak = f"{page['peak_memory_bytes'] / 2**20:>9.1f}" if peaks is not None else f"{'-':>9}"
+            print(f"{name:<18}{len(runs):>6}{first_run * 1e3:>10.1f}{page['wall_s']['p50'] * 1e3:>9.1f}"
+                  f"{page['wall_s']['p90'] * 1e3:>9.1f}"
+                  + "".join(f"{page['stages_mean_s'][stage] * 1e3:>10.2f}" for stage in (*STAGES, "other"))
+                  + peak + (f"  ({page['errors']} errors)" if page["errors"] else ""))
+    finally:
+        remove_listener(totals)
+
+    result = {
+        "benchmark": "pages",
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "options": {"quick": args.quick, "year_step": year_step, "cold": args.cold, "sessions": args.sessions},
+        "python": platform.python_version(),
+        "pages": pages,
+        "figure_cache": figure_cache.stats(),
+    }
+    result["commit"], result["dirty"] = git_commit()
+
+    if args.sessions:
+        result["concurrent"] = run = concurrent(states, args.sessions, args.cold)
+        print(f"\n{run['sessions']} sessions: {run['interactions']} interactions in {run['elapsed_s']:.1f}s, "
+              f"{run['throughput_per_s']:.1f}/s, p50 {run['latency_s']['p50'] * 1e3:.0f}ms, "
+              f"p99 {run['latency_s']['p99'] * 1e3:.0f}ms"
+              + (f" ({run['errors']} errors)" if run["errors"] else ""))
+
+    output = args.output
+    if output is None:
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(ROOT, "benchmarks", "results", f"pages-{(result['commit'] or 'nogit')[:10]}-{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2, default=str)
+    print(f"\nwrote {output}")
+
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
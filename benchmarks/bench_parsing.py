@@ -0,0 +1,66 @@
+"""Benchmark the vectorized suffix parser against the old applymap path.
+
+Run from the repository root::
+
+    python benchmarks/bench_parsing.py [--repeat N]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from observatory.parsing import parse_suffixed  # noqa: E402
+
+FILES = ["pop.csv", "gdp_pcap.csv", "mincpcap_cppp.csv"]
+
+
+def convert_population(value):
+    """The per-cell converter page 2 used before the vectorized parser."""
+    if isinstance(value, str):
+        if 'B' in value:
+            return float(value.replace('B', '')) * 1_000_000_000
+        elif 'M' in value:
+            return float(value.replace('M', '')) * 1_000_000
+        elif 'k' in value:
+            return float(value.replace('k', '')) * 1_000
+        else:
+            return float(value)
+    return value
+
+
+def applymap_path(frame):
+    # DataFrame.applymap was renamed to DataFrame.map in pandas 2.1.
+    elementwise = getattr(frame, "map", None) or frame.applymap
+    return elementwise(convert_population).astype(np.float64)
+
+
+def vectorized_path(frame):
+    return parse_suffixed(frame)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    print(f"{'file':<20}{'cells':>8}{'applymap ms':>14}{'vectorized ms':>16}{'speedup':>10}")
+    for name in FILES:
+        frame = pd.read_csv(os.path.join(root, name)).set_index("country")
+        old = applymap_path(frame)
+        new, unparsed = parse_suffixed(frame)
+        pd.testing.assert_frame_equal(old, new, check_exact=False)
+
+        old_ms = min(timeit.repeat(lambda: applymap_path(frame), number=1, repeat=args.repeat)) * 1e3
+        new_ms = min(timeit.repeat(lambda: vectorized_path(frame), number=1, repeat=args.repeat)) * 1e3
+        print(f"{name:<20}{frame.size:>8}{old_ms:>14.1f}{new_ms:>16.1f}{old_ms / new_ms:>9.1f}x"
+              + (f"  ({unparsed} unparsed)" if unparsed else ""))
+
+
+if __name__ == "__main__":
+    main()
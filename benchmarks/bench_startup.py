@@ -0,0 +1,123 @@
+"""Benchmark a fresh worker's first run of the landing page.
+
+Each sample starts a new Python process, so nothing is imported or cached
+yet, and runs app.py once through Streamlit's ``AppTest``. It records the
+time until the first element (the title) is sent, the time until the run
+finishes, and whether Altair or Plotly Express had already been imported
+when the title went out.
+
+``--baseline REV`` checks out ``REV`` into a temporary git worktree and
+measures it the same way, e.g. the commit before the lazy imports::
+
+    python benchmarks/bench_startup.py [--repeat N] [--baseline REV] [--cold-store]
+
+The stores for both trees are built before timing starts, so the figures
+are for a warm host. ``--cold-store`` starts every sample without a store
+(through ``OBSERVATORY_STORE_DIR``), so the store build is included.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the fresh process, with the tree under test as the working directory
+CHILD = r"""
+import json, os, sys, time
+sys.path.insert(0, os.getcwd())
+from streamlit.delta_generator import DeltaGenerator
+from streamlit.testing.v1 import AppTest
+
+marks = {}
+enqueue = DeltaGenerator._enqueue
+
+def timed_enqueue(self, *args, **kwargs):
+    if "first_element" not in marks:
+        marks["first_element"] = time.perf_counter()
+        marks["charting"] = [m for m in ("altair", "plotly.express") if m in sys.modules]
+    return enqueue(self, *args, **kwargs)
+
+DeltaGenerator._enqueue = timed_enqueue
+start = time.perf_counter()
+at = AppTest.from_file(os.path.join(os.getcwd(), "app.py"), default_timeout=600).run()
+end = time.perf_counter()
+print(json.dumps({
+    "first_element_s": marks.get("first_element", end) - start,
+    "first_run_s": end - start,
+    "charting_before_first_element": marks.get("charting", []),
+    "error": str(at.exception[0].value) if at.exception else None,
+}))
+"""
+
+
+def sample(tree, cold_store):
+    env = dict(os.environ)
+    scratch = None
+    if cold_store:
+        scratch = tempfile.mkdtemp(prefix="store-")
+        env["OBSERVATORY_STORE_DIR"] = scratch
+        # Revisions without OBSERVATORY_STORE_DIR build into the worktree's own store
+        if tree != ROOT:
+            shutil.rmtree(os.path.join(tree, "store"), ignore_errors=True)
+    try:
+        result = subprocess.run([sys.executable, "-c", CHILD], cwd=tree, env=env,
+                                capture_output=True, text=True, check=True)
+    finally:
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure(tree, repeat, cold_store):
+    samples = [sample(tree, cold_store) for _ in range(repeat)]
+    errors = [s["error"] for s in samples if s["error"]]
+    return {
+        "first_element_s": statistics.median(s["first_element_s"] for s in samples),
+        "first_run_s": statistics.median(s["first_run_s"] for s in samples),
+        "charting": samples[-1]["charting_before_first_element"],
+        "errors": errors,
+    }
+
+
+def build_store(tree):
+    subprocess.run([sys.executable, "-m", "observatory.store", "build"], cwd=tree,
+                   capture_output=True, check=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", metavar="REV", help="also measure this git revision")
+    parser.add_argument("--cold-store", action="store_true", help="start every sample without a store")
+    args = parser.parse_args()
+
+    trees = [("working tree", ROOT)]
+    worktree = None
+    if args.baseline:
+        worktree = tempfile.mkdtemp(prefix="bench-startup-")
+        subprocess.run(["git", "worktree", "add", "--detach", worktree, args.baseline], cwd=ROOT,
+                       capture_output=True, check=True)
+        trees.insert(0, (args.baseline, worktree))
+
+    try:
+        print(f"{'tree':<16}{'first element ms':>18}{'first run ms':>14}  charting imported before title")
+        for label, tree in trees:
+            if not args.cold_store:
+                build_store(tree)
+            result = measure(tree, args.repeat, args.cold_store)
+            print(f"{label:<16}{result['first_element_s'] * 1e3:>18.0f}{result['first_run_s'] * 1e3:>14.0f}  "
+                  + (", ".join(result["charting"]) or "-")
+                  + (f"  ({len(result['errors'])} errors: {result['errors'][0]})" if result["errors"] else ""))
+    finally:
+        if worktree is not None:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=ROOT,
+                           capture_output=True, check=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Shared data access and helpers for the child mortality Streamlit pages."""
@@ -0,0 +1,108 @@
+"""Chart pieces shared by the page scripts.
+
+Year playback sends every year of a view in one chart and lets the browser
+move between them: the landing page map as Plotly animation frames, and the
+GDP and income scatters through :func:`playback_scatter`, whose year slider
+is a Vega-Lite parameter, so a new year is a client-side filter rather than
+a rerun. Both scatter pages also show the per-year regression behind their
+fitted line with :func:`regression_trend`. Altair is imported inside the
+builders, so importing this module stays cheap.
+"""
+import json
+import threading
+
+import streamlit as st
+
+PLAY_LABEL = "Play through the years"
+
+_rows_lock = threading.Lock()
+_rows_unlimited = False
+
+
+def playback_toggle():
+    """The toggle that switches a page from its year slider to playback."""
+    return st.toggle(PLAY_LABEL, help="Send all years at once and move through them in the chart, "
+                                      "without a rerun per year")
+
+
+def _year_title(template, param):
+    """Vega expression for ``template`` with ``{year}`` replaced by ``param``."""
+    before, after = template.split("{year}")
+    return f"{json.dumps(before)} + {param.name} + {json.dumps(after)}"
+
+
+def playback_scatter(points, x, y, years, start_year, title, x_title, y_title, tooltip, line=None,
+                     width=700, height=500):
+    """Scatter of ``points`` showing one year at a time, chosen with a slider.
+
+    ``points`` is a long frame with ``country``, ``year``, ``x`` and ``y``
+    for every year in the inclusive ``years`` range; ``line``, if given,
+    holds the fitted line per year with ``year``, ``x`` and ``y``. The x axis
+    is logarithmic and both axes are fixed across years, so the points move
+    rather than the scales. ``title`` may contain ``{year}``.
+    """
+    import altair as alt
+
+    selected_year = alt.param(
+        name="play_year", value=start_year,
+        bind=alt.binding_range(min=years[0], max=years[1], step=1, name="Year "),
+    )
+    in_year = alt.datum.year == selected_year
+    scatter = alt.Chart(points).mark_circle(size=60).encode(
+        x=alt.X(f"{x}:Q", title=x_title, scale=alt.Scale(type="log", domain=[points[x].min(), points[x].max()])),
+        y=alt.Y(f"{y}:Q", title=y_title, scale=alt.Scale(domain=[0, points[y].max()])),
+        color=alt.Color("country:N"),
+        tooltip=tooltip,
+    ).transform_filter(in_year).properties(
+        title=alt.Title(alt.expr(_year_title(title, selected_year))),
+        width=width,
+        height=height,
+    )
+    if line is not None:
+        fitted = alt.Chart(line).mark_line(color="red").encode(x=f"{x}:Q", y=f"{y}:Q").transform_filter(in_year)
+        scatter = scatter + fitted
+    return scatter.add_params(selected_year)
+
+
+def regression_trend(coefficients, year, width=700):
+    """Faceted slope and R² lines of a per-year regression, ``year`` marked in red.
+
+    ``coefficients`` is a frame from ``IndicatorStats.regression``.
+    """
+    import altair as alt
+
+    coefficients = coefficients.reset_index().melt(
+        id_vars=["year", "n"], value_vars=["slope", "r2"], var_name="measure"
+    )
+    trend = alt.Chart(coefficients).mark_line().encode(
+        x=alt.X("year:Q", title="Year", axis=alt.Axis(format="d")),
+        y=alt.Y("value:Q", title=None),
+        tooltip=["year", "value", "n"],
+    ).properties(width=width, height=180)
+    selected = alt.Chart(coefficients).mark_rule(color="red").encode(x="year:Q").transform_filter(
+        alt.datum.year == year
+    )
+    return (trend + selected).facet(
+        row=alt.Row("measure:N", title=None, sort=["slope", "r2"])
+    ).resolve_scale(y="independent")
+
+
+def _unlimit_rows():
+    """Drop Altair's 5000-row guard, which every-year data exceeds, once per process.
+
+    The transformer registry is shared by every session, so it is set once
+    and left alone rather than toggled around each ``to_dict`` call.
+    """
+    global _rows_unlimited
+    with _rows_lock:
+        if not _rows_unlimited:
+            import altair as alt
+
+            alt.data_transformers.enable("default", max_rows=None)
+            _rows_unlimited = True
+
+
+def to_spec(chart):
+    """``chart.to_dict()`` with every row of the chart's data kept."""
+    _unlimit_rows()
+    return chart.to_dict()
@@ -0,0 +1,79 @@
+"""Year-sliced access to the indicator store.
+
+The choropleth and scatter pages used to melt a whole wide table into ~60k
+long rows and then scan it with ``data[data["year"] == year]`` on every
+slider move. The store already keeps each indicator as a ``countries x
+years`` matrix on shared axes, so a year is just a column: the cube maps the
+year to its column position once and hands out that column, or several
+indicators' columns side by side, without melting, scanning or merging.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from observatory.store import open_store, widen
+
+_lock = threading.Lock()
+_cube = None
+
+
+class IndicatorCube:
+    """Indicators stacked on a shared country index and year axis."""
+
+    def __init__(self, store):
+        self.store = store
+        self.countries = store.countries
+        self.years = store.years
+        self._positions = {int(year): i for i, year in enumerate(self.years)}
+
+    def column(self, year):
+        """Position of ``year`` on the year axis."""
+        try:
+            return self._positions[int(year)]
+        except KeyError:
+            raise KeyError(f"Year {year} is outside {self.years[0]}-{self.years[-1]}") from None
+
+    def values(self, name, year):
+        """The raw column of ``name`` for ``year``, a view into the store."""
+        return self.store.matrix(name)[:, self.column(year)]
+
+    def year_slice(self, name, year, dropna=True):
+        """Series of ``name`` for ``year`` indexed by country, as float64."""
+        series = pd.Series(widen(self.values(name, year)), index=self.countries, name=name)
+        return series.dropna() if dropna else series
+
+    def joined_slice(self, names, year, dropna=True):
+        """Frame with one column per indicator in ``names`` for ``year``.
+
+        Rows are countries; with ``dropna`` only countries that have every
+        indicator for that year are kept. ``country`` is a regular column so
+        the result can go straight into a chart.
+        """
+        position = self.column(year)
+        block = np.column_stack([self.store.matrix(name)[:, position] for name in names])
+        if dropna:
+            keep = ~np.isnan(block).any(axis=1)
+            block, countries = block[keep], self.countries[keep]
+        else:
+            countries = self.countries
+        frame = pd.DataFrame(widen(block), columns=list(names))
+        frame.insert(0, "country", countries)
+        return frame
+
+    def year_span(self, names):
+        """First and last year where some country has every indicator in ``names``."""
+        present = np.ones(self.store.matrix(names[0]).shape, dtype=bool)
+        for name in names:
+            present &= ~np.isnan(self.store.matrix(name))
+        covered = np.flatnonzero(present.any(axis=0))
+        return int(self.years[covered[0]]), int(self.years[covered[-1]])
+
+
+def get_cube():
+    """Return the process-wide :class:`IndicatorCube`."""
+    global _cube
+    with _lock:
+        if _cube is None:
+            _cube = IndicatorCube(open_store())
+        return _cube
@@ -0,0 +1,54 @@
+"""Opt-in sidebar panel with the stage timings of the current rerun.
+
+Every page ends with ``finish_page()``, which closes the rerun's trace (see
+``observatory.tracing``). The panel itself only appears with ``?debug=1`` in
+the URL or ``OBSERVATORY_DEBUG=1`` in the environment, and lists each
+stage's time and resident-memory change for this rerun next to the page's
+p50/p90 so far, followed by the figure cache's size, hit rate and
+evictions. pandas is only imported for the panel, so pages can send
+their first elements before it is loaded.
+"""
+import os
+
+import streamlit as st
+
+from observatory.figures import figure_cache
+from observatory.tracing import finish_run, histograms
+
+DEBUG = os.environ.get("OBSERVATORY_DEBUG", "") == "1"
+
+
+def debug_enabled():
+    return DEBUG or st.query_params.get("debug") == "1"
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1e3, 2)
+
+
+def finish_page():
+    """Close the rerun's trace and show the timing panel when debugging."""
+    trace = finish_run()
+    if trace is None or not debug_enabled():
+        return
+    import pandas as pd
+
+    history = {name: histogram for (page, name), histogram in histograms().items() if page == trace.page}
+    rows = [
+        {
+            "stage": name,
+            "ms": _ms(seconds),
+            "memory MB": round(trace.memory[name] / 2**20, 2) if name in trace.memory else None,
+            "p50 ms": _ms(history[name].quantile(0.5)) if name in history else None,
+            "p90 ms": _ms(history[name].quantile(0.9)) if name in history else None,
+        }
+        for name, seconds in trace.stages.items()
+    ]
+    with st.sidebar.expander("Stage timings", expanded=True):
+        st.caption(f"Rerun of {trace.page}: {trace.elapsed * 1e3:.0f} ms "
+                   "(p50/p90 are histogram bucket bounds since the process started)")
+        st.dataframe(pd.DataFrame(rows), hide_index=True)
+        cache = figure_cache.stats()
+        st.caption(f"Figure cache: {cache['entries']} specs, {cache['bytes'] / 2**20:.1f} of "
+                   f"{cache['max_bytes'] / 2**20:.0f} MB, hit rate {cache['hit_rate']:.0%} "
+                   f"({cache['hits']} hits, {cache['misses']} misses), {cache['evictions']} evictions")
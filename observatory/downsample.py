@@ -0,0 +1,163 @@
+"""Min/max bucketed downsampling for the trend charts.
+
+Drawing every year for every selected country makes the line charts heavy
+once dozens of countries are picked, while keeping only every 20th year (as
+the population page did) throws away short events such as the 1918
+pandemic. The pyramid here precomputes, per indicator and for every country
+at once, the positions of the minimum and maximum of each bucket of
+``1, 2, 4, ... 32`` consecutive years. A request picks the finest level that
+keeps the chart under its point budget for the selected range and number of
+series, so point counts stay bounded and extremes are always kept.
+"""
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+
+from observatory.store import open_store, widen
+
+BUCKET_SIZES = (1, 2, 4, 8, 16, 32)
+MAX_POINTS = 2000
+MIN_POINTS_PER_SERIES = 16
+
+_lock = threading.Lock()
+_pyramid = None
+
+
+def bucket_extrema(matrix, size):
+    """Positions of each row's min and max in every ``size``-wide bucket.
+
+    Returns an int array of shape ``(rows, 2 * buckets)`` holding column
+    positions in ascending order within each row, with ``-1`` for buckets
+    that are entirely NaN.
+    """
+    rows, columns = matrix.shape
+    buckets = math.ceil(columns / size)
+    padded = np.full((rows, buckets * size), np.nan)
+    padded[:, :columns] = matrix
+    blocks = padded.reshape(rows, buckets, size)
+    missing = np.isnan(blocks)
+    low = np.where(missing, np.inf, blocks).argmin(axis=2)
+    high = np.where(missing, -np.inf, blocks).argmax(axis=2)
+    offsets = (np.arange(buckets) * size)[None, :, None]
+    positions = np.sort(np.stack([low, high], axis=2), axis=2) + offsets
+    positions[missing.all(axis=2)] = -1
+    return positions.reshape(rows, 2 * buckets)
+
+
+class Pyramid:
+    """Per-indicator bucket levels over one store."""
+
+    def __init__(self, store):
+        self.store = store
+        self.countries = store.countries
+        self.years = store.years
+        self._levels = {}
+        self._lock = threading.Lock()
+
+    def level(self, name, size):
+        """Bucket extrema of ``name`` for every country at ``size``."""
+        key = (name, size)
+        with self._lock:
+            if key not in self._levels:
+                self._levels[key] = bucket_extrema(widen(self.store.matrix(name)), size)
+            return self._levels[key]
+
+    def updated(self, store, changes):
+        """Pyramid over ``store`` reusing the levels ``changes`` leave intact.
+
+        With unchanged axes only the rows of changed countries are bucketed
+        again; levels of unchanged indicators are shared as they are.
+        """
+        pyramid = Pyramid(store)
+        if changes.axes_changed:
+            return pyramid
+        with self._lock:
+            levels = dict(self._levels)
+        for (name, size), level in levels.items():
+            if name in changes.names:
+                rows = store.countries.get_indexer(sorted(changes.countries(name)))
+                level = level.copy()
+                level[rows] = bucket_extrema(widen(store.matrix(name)[rows]), size)
+            pyramid._levels[(name, size)] = level
+        return pyramid
+
+    def choose_size(self, span, series, max_points=MAX_POINTS):
+        """Finest bucket size that keeps ``series`` lines of ``span`` years in budget."""
+        budget = max(MIN_POINTS_PER_SERIES, max_points // max(1, series))
+        for size in BUCKET_SIZES:
+            # Ranges rarely line up with buckets, so allow a partial one at each end
+            points = span if size == 1 else 2 * (math.ceil(span / size) + 1) + 2
+            if points <= budget:
+                return size
+        return BUCKET_SIZES[-1]
+
+    def _clipped_level(self, name, size, rows, first, last):
+        """Bucket extrema of ``rows`` for the buckets that overlap ``[first, last]``.
+
+        Buckets are aligned to the start of the year axis, so the ones the
+        range cuts through are recomputed over their part inside the range;
+        otherwise an extreme just outside it would hide the one inside.
+        """
+        low, high = first // size, last // size
+        level = self.level(name, size)[rows, 2 * low:2 * high + 2].copy()
+        matrix = self.store.matrix(name)
+        edges = {0: (first, min(last, (low + 1) * size - 1)), high - low: (max(first, high * size), last)}
+        for bucket, (start, end) in edges.items():
+            window = bucket_extrema(widen(matrix[rows, start:end + 1]), end + 1 - start)
+            level[:, 2 * bucket:2 * bucket + 2] = np.where(window >= 0, window + start, -1)
+        return level
+
+    def frame(self, name, countries, years=None, max_points=MAX_POINTS):
+        """Long frame of ``country``, ``year`` and ``name`` within the budget.
+
+        ``years`` is an inclusive ``(first, last)`` range; a range that
+        misses the year axis gives an empty frame. The chosen bucket size is
+        stored in ``frame.attrs["bucket_size"]``.
+        """
+        rows = self.countries.get_indexer(list(countries))
+        rows = rows[rows >= 0]
+        if years is None:
+            first, last = 0, len(self.years) - 1
+        else:
+            first = np.searchsorted(self.years, years[0])
+            last = np.searchsorted(self.years, years[1], side="right") - 1
+        if last < first:
+            frame = pd.DataFrame({"country": self.countries[:0], "year": self.years[:0], name: np.empty(0)})
+            frame.attrs["bucket_size"] = 1
+            return frame
+        size = self.choose_size(last - first + 1, len(rows), max_points)
+
+        if size == 1:
+            positions = np.broadcast_to(np.arange(first, last + 1), (len(rows), last - first + 1))
+        else:
+            # Keep the ends of the range so lines span the whole selection
+            ends = np.ones((len(rows), 1), dtype=np.int64)
+            positions = np.hstack([ends * first, self._clipped_level(name, size, rows, first, last), ends * last])
+        keep = (positions >= first) & (positions <= last)
+        row_index, column_index = np.nonzero(keep)
+        picked = positions[row_index, column_index]
+        # A bucket whose min and max fall on the same year yields it twice
+        duplicate = np.zeros(len(picked), dtype=bool)
+        duplicate[1:] = (row_index[1:] == row_index[:-1]) & (picked[1:] == picked[:-1])
+        row_index, picked = row_index[~duplicate], picked[~duplicate]
+
+        values = widen(self.store.matrix(name)[rows[row_index], picked])
+        frame = pd.DataFrame({
+            "country": self.countries[rows[row_index]],
+            "year": self.years[picked],
+            name: values,
+        })
+        frame = frame.dropna(subset=[name], ignore_index=True)
+        frame.attrs["bucket_size"] = size
+        return frame
+
+
+def get_pyramid():
+    """Return the process-wide :class:`Pyramid`."""
+    global _pyramid
+    with _lock:
+        if _pyramid is None:
+            _pyramid = Pyramid(open_store())
+        return _pyramid
@@ -0,0 +1,215 @@
+"""Server-side cache of rendered chart specs.
+
+Building a Plotly choropleth or an Altair chart and serializing it is a
+noticeable share of each rerun, yet most reruns land on a widget state that
+has been rendered before (the default year, the default country set). The
+cache keeps the finished spec (an Altair ``chart.to_dict()`` or a Plotly
+figure, which Streamlit serializes cheaply) keyed by page and widget state,
+evicts least recently used entries once a byte budget is exceeded, and
+counts hits so the budget can be tuned.
+
+Entries can record what they were drawn from (``depends``: indicators,
+years, countries), so a data refresh only drops the specs it affects; see
+``invalidate_changes``. Pages read ``figure_cache.generation`` before they
+fetch the cube, panel or stats, and pass it along with each build, so a
+spec drawn from a store that a refresh swapped out meanwhile is not cached.
+
+The budget is read from ``OBSERVATORY_FIGURE_CACHE_MB`` (default 64).
+Pre-warming the slider steps at startup is opt-in with
+``OBSERVATORY_PREWARM=1``.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = int(float(os.environ.get("OBSERVATORY_FIGURE_CACHE_MB", "64")) * 2**20)
+PREWARM = os.environ.get("OBSERVATORY_PREWARM", "") == "1"
+
+
+def _freeze(value):
+    """Turn widget state into something hashable and order-stable."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, set):
+        return tuple(sorted(_freeze(item) for item in value))
+    return value
+
+
+def spec_size(spec):
+    """Size in bytes of ``spec`` once serialized to JSON."""
+    to_json = getattr(spec, "to_json", None)
+    text = to_json() if callable(to_json) else json.dumps(spec, default=str)
+    return len(text.encode())
+
+
+class FigureCache:
+    """Byte-bounded LRU cache of chart specs keyed by page and widget state."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, prewarm=PREWARM):
+        self.max_bytes = max_bytes
+        self.prewarm_enabled = prewarm
+        self._warmed = set()
+        self._entries = OrderedDict()  # key -> (spec, size, depends)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        # Bumped by every invalidation; specs drawn from data fetched before a bump are not kept
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, page, state):
+        return (page, _freeze(state))
+
+    def get(self, page, state):
+        """Cached spec for ``page``/``state``, or ``None``."""
+        key = self.key(page, state)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, page, state, spec, depends=None, generation=None):
+        """Store ``spec``; specs larger than the whole budget are not kept.
+
+        ``depends`` is a dict with any of ``indicators``, ``years`` and
+        ``countries`` naming the data the spec was drawn from; a missing key
+        or ``depends=None`` means "all of it". ``generation``, if given, is
+        :attr:`generation` as read before that data was fetched; the spec is
+        not kept if an invalidation has happened since.
+        """
+        key = self.key(page, state)
+        size = spec_size(spec)
+        if size > self.max_bytes:
+            return spec
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return spec
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self._entries[key] = (spec, size, depends)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+        return spec
+
+    def get_or_build(self, page, state, build, depends=None, generation=None):
+        """Return the cached spec or call ``build()`` and cache its result.
+
+        ``build`` must return a JSON-serializable spec dict or a Plotly
+        figure. ``depends`` and ``generation`` are passed on to :meth:`put`;
+        pages read ``generation`` before fetching the data objects ``build``
+        draws on, and without it the generation at the start of the build is
+        used.
+        """
+        spec = self.get(page, state)
+        if spec is None:
+            if generation is None:
+                generation = self.generation
+            spec = build()
+            self.put(page, state, spec, depends, generation)
+        return spec
+
+    def prewarm(self, page, states, build, background=True, depends=None, generation=None):
+        """Render ``build(state)`` for each state not already cached.
+
+        Does nothing unless pre-warming is enabled, and runs at most once per
+        page. With ``background`` the work runs in a daemon thread so it does
+        not hold up the rerun that asked for it. ``depends(state)``, if
+        given, returns each spec's ``depends``; ``generation`` is as for
+        :meth:`get_or_build`, defaulting to the generation at this call.
+        Returns the thread, if any.
+        """
+        with self._lock:
+            if not self.prewarm_enabled or page in self._warmed:
+                return None
+            self._warmed.add(page)
+        if generation is None:
+            generation = self.generation
+
+        def run():
+            for state in states:
+                key = self.key(page, state)
+                with self._lock:
+                    if generation != self.generation:
+                        # Invalidated since; let the next rerun warm the page from the new data
+                        self._warmed.discard(page)
+                        return
+                    cached = key in self._entries
+                if not cached:
+                    spec = build(state)
+                    self.put(page, state, spec, depends(state) if depends else None, generation)
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name=f"prewarm-{page}", daemon=True)
+        thread.start()
+        return thread
+
+    def size(self, page, state, spec):
+        """Serialized size of ``spec``, taken from its entry when it is cached.
+
+        Saves serializing a large figure again on every rerun just to report
+        its size.
+        """
+        with self._lock:
+            entry = self._entries.get(self.key(page, state))
+        if entry is not None and entry[0] is spec:
+            return entry[1]
+        return spec_size(spec)
+
+    def invalidate(self, page=None):
+        """Drop every entry, or only those for ``page``."""
+        with self._lock:
+            self.generation += 1
+            for key in [k for k in self._entries if page is None or k[0] == page]:
+                self.bytes -= self._entries.pop(key)[1]
+            if page is None:
+                self._warmed.clear()
+            else:
+                self._warmed.discard(page)
+
+    def invalidate_changes(self, changes):
+        """Drop the entries whose ``depends`` overlap ``changes``.
+
+        ``changes`` is an ``observatory.refresh.Changes``. Returns the number
+        of entries dropped.
+        """
+        with self._lock:
+            self.generation += 1
+            stale = [
+                key for key, (_, _, depends) in self._entries.items()
+                if changes.touches(**(depends or {}))
+            ]
+            for key in stale:
+                self.bytes -= self._entries.pop(key)[1]
+                self._warmed.discard(key[0])
+            return len(stale)
+
+    def stats(self):
+        """Counters for tuning the budget."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+figure_cache = FigureCache()
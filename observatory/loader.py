@@ -0,0 +1,189 @@
+"""Process-wide loader for the bundled Gapminder indicator tables.
+
+Every page used to call ``pd.read_csv`` on the HuggingFace URLs at module
+level, so each Streamlit rerun paid for a download and a full parse. The
+functions here load each indicator once per process, prefer the CSVs that
+ship with the repo, and only fall back to the remote copy when a local file
+is missing.
+
+Files are read, downloaded (with a ``FETCH_TIMEOUT`` second timeout) and
+parsed outside the cache lock, so a slow fetch of one indicator does not
+hold up loads of the others. Parsed frames are cached by the SHA-256 of the
+file content. A cheap
+``(mtime, size)`` check decides whether the file has to be hashed again, so
+an unchanged file costs one ``os.stat`` per call and an edited file is
+re-parsed on the next call.
+
+The returned frames are shared between sessions and must be treated as
+read-only; take a ``.copy()`` before modifying one in place.
+"""
+import hashlib
+import io
+import os
+import threading
+import time
+import urllib.request
+
+import pandas as pd
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REMOTE_BASE = "https://huggingface.co/spaces/jiyachachan/fp2/resolve/main/"
+FETCH_TIMEOUT = 30
+
+INDICATORS = {
+    "child_mortality": "child_mortality_0_5_year_olds_dying_per_1000_born.csv",
+    "life_expectancy": "life_expectancy.csv",
+    "population": "pop.csv",
+    "gdp_per_capita": "gdp_pcap.csv",
+    "income": "mincpcap_cppp.csv",
+    "school_years_men": "mean_years_in_school_men_15_to_24_years.csv",
+    "school_years_women": "mean_years_in_school_women_15_to_24_years.csv",
+}
+
+_lock = threading.Lock()
+_entries = {}  # name -> {"signature", "digest", "frame", "source"}
+_stats = {"hits": 0, "misses": 0, "load_seconds": 0.0, "by_indicator": {}}
+
+
+def local_path(name):
+    """Path of the bundled CSV for ``name``."""
+    return os.path.join(DATA_DIR, INDICATORS[name])
+
+
+def remote_url(name):
+    """HuggingFace URL of the CSV for ``name``."""
+    return REMOTE_BASE + INDICATORS[name]
+
+
+def _signature(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _read_source(name):
+    """Return ``(raw_bytes, signature, source)`` for the indicator."""
+    path = local_path(name)
+    if os.path.exists(path):
+        signature = _signature(path)
+        with open(path, "rb") as fh:
+            return fh.read(), signature, path
+    url = remote_url(name)
+    with urllib.request.urlopen(url, timeout=FETCH_TIMEOUT) as response:
+        return response.read(), None, url
+
+
+def _record(name, hit, seconds):
+    per = _stats["by_indicator"].setdefault(
+        name, {"hits": 0, "misses": 0, "load_seconds": 0.0}
+    )
+    key = "hits" if hit else "misses"
+    _stats[key] += 1
+    per[key] += 1
+    _stats["load_seconds"] += seconds
+    per["load_seconds"] += seconds
+
+
+def _is_fresh(entry, name):
+    """True when the cached entry can be served without touching the file."""
+    if entry["signature"] is None:
+        # Remote copies are fetched once per process.
+        return True
+    path = local_path(name)
+    return os.path.exists(path) and _signature(path) == entry["signature"]
+
+
+def load_indicator(name):
+    """Return the wide ``country x year`` table for ``name``.
+
+    The frame has a ``country`` column followed by one column per year, as in
+    the source CSV.
+    """
+    if name not in INDICATORS:
+        raise KeyError(f"Unknown indicator: {name!r}")
+    start = time.perf_counter()
+    with _lock:
+        entry = _entries.get(name)
+        if entry is not None and _is_fresh(entry, name):
+            _record(name, True, time.perf_counter() - start)
+            return entry["frame"]
+
+    # Concurrent misses for the same indicator may both read it; the last one is kept
+    raw, signature, source = _read_source(name)
+    digest = hashlib.sha256(raw).hexdigest()
+    with _lock:
+        entry = _entries.get(name)
+        if entry is not None and entry["digest"] == digest:
+            # Touched but unchanged: keep the parsed frame.
+            entry["signature"] = signature
+            _record(name, True, time.perf_counter() - start)
+            return entry["frame"]
+
+    frame = pd.read_csv(io.BytesIO(raw))
+    with _lock:
+        _entries[name] = {
+            "signature": signature,
+            "digest": digest,
+            "frame": frame,
+            "source": source,
+        }
+        _record(name, False, time.perf_counter() - start)
+        return frame
+
+
+def read_source(name):
+    """Raw bytes of the CSV for ``name`` (local copy first) and their origin."""
+    raw, _, source = _read_source(name)
+    return raw, source
+
+
+def remote_signature(name, timeout=FETCH_TIMEOUT):
+    """``(ETag, Content-Length)`` of the remote CSV, from a HEAD request."""
+    request = urllib.request.Request(remote_url(name), method="HEAD")
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.headers.get("ETag"), response.headers.get("Content-Length")
+
+
+def forget(name):
+    """Drop the cached frame for ``name`` so the next load reads it again."""
+    with _lock:
+        _entries.pop(name, None)
+
+
+def source_digest(name):
+    """SHA-256 of the bundled CSV for ``name`` without parsing it.
+
+    Returns ``None`` when there is no local copy.
+    """
+    path = local_path(name)
+    if not os.path.exists(path):
+        return None
+    with _lock:
+        entry = _entries.get(name)
+        if entry is not None and entry["signature"] == _signature(path):
+            return entry["digest"]
+    with open(path, "rb") as fh:
+        return hashlib.sha256(fh.read()).hexdigest()
+
+
+def content_hash(name):
+    """SHA-256 of the content currently cached for ``name``, if loaded."""
+    entry = _entries.get(name)
+    return entry["digest"] if entry else None
+
+
+def cache_stats():
+    """Snapshot of the hit/miss counters and cumulative load time."""
+    with _lock:
+        return {
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "load_seconds": _stats["load_seconds"],
+            "by_indicator": {k: dict(v) for k, v in _stats["by_indicator"].items()},
+            "cached": {k: v["source"] for k, v in _entries.items()},
+        }
+
+
+def clear_cache():
+    """Drop every cached frame; counters are kept."""
+    with _lock:
+        _entries.clear()
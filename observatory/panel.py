@@ -0,0 +1,74 @@
+"""Aligned country x year x indicator panel over the store.
+
+Each page used to build its own long table by melting two wide CSVs and
+merging them on ``country``/``year``. Every store matrix is already laid out
+on the same country index and year axis, so the panel only has to pick the
+requested rows and year columns out of each indicator and lay them side by
+side. Country names are normalized and missing values are NaN when the store
+is built, so any combination of indicators comes back already aligned.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from observatory.store import open_store, widen
+
+_lock = threading.Lock()
+_panel = None
+
+
+class Panel:
+    """Long-format access to any combination of indicators."""
+
+    def __init__(self, store):
+        self.store = store
+        self.countries = store.countries
+        self.years = store.years
+        self.indicators = store.names
+
+    def countries_with(self, name):
+        """Countries that have at least one value for ``name``."""
+        matrix = self.store.matrix(name)
+        return list(self.countries[~np.isnan(matrix).all(axis=1)])
+
+    def _rows(self, countries):
+        if countries is None:
+            return np.arange(len(self.countries))
+        rows = self.countries.get_indexer(list(countries))
+        return rows[rows >= 0]
+
+    def _columns(self, years):
+        if years is None:
+            return np.arange(len(self.years))
+        first, last = years
+        return np.flatnonzero((self.years >= first) & (self.years <= last))
+
+    def frame(self, names, countries=None, years=None, dropna=None):
+        """Long frame with ``country``, ``year`` and one column per indicator.
+
+        ``countries`` restricts and orders the rows, ``years`` is an inclusive
+        ``(first, last)`` range. ``dropna`` may be ``"any"`` to keep only
+        rows where every indicator is present, ``"all"`` to drop rows where
+        none is, or ``None`` to keep every country-year.
+        """
+        rows = self._rows(countries)
+        columns = self._columns(years)
+        frame = pd.DataFrame({
+            "country": np.repeat(self.countries[rows].to_numpy(), len(columns)),
+            "year": np.tile(self.years[columns], len(rows)),
+        })
+        for name in names:
+            frame[name] = widen(self.store.matrix(name)[np.ix_(rows, columns)].ravel())
+        if dropna is not None:
+            frame = frame.dropna(subset=list(names), how=dropna, ignore_index=True)
+        return frame
+
+
+def get_panel():
+    """Return the process-wide :class:`Panel`."""
+    global _panel
+    with _lock:
+        if _panel is None:
+            _panel = Panel(open_store())
+        return _panel
@@ -0,0 +1,94 @@
+"""Conversion of Gapminder value strings to numbers.
+
+pop.csv and gdp_pcap.csv abbreviate large values with a suffix ("3.28M",
+"12k"), so those columns arrive from ``read_csv`` as strings. Rather than
+calling a Python function per cell, the parser rewrites every suffix as an
+exponent ("3.28M" -> "3.28e6") in one pass over all text cells and lets
+NumPy convert the result in bulk.
+"""
+import numpy as np
+import pandas as pd
+
+SUFFIXES = {"k": "e3", "M": "e6", "B": "e9", "T": "e12"}
+_SEP = "\x1f"
+
+
+def _to_floats(cells):
+    """Convert exponent-form strings to float64, NaN where unparseable."""
+    try:
+        return np.array(cells, dtype=np.float64)
+    except ValueError:
+        return pd.to_numeric(pd.Series(cells, dtype=object), errors="coerce").to_numpy(
+            dtype=np.float64
+        )
+
+
+def parse_suffixed(frame):
+    """Convert every column of ``frame`` to float64.
+
+    Text columns may carry a k/M/B/T suffix. Returns ``(numeric_frame,
+    unparsed)`` where ``unparsed`` counts the non-missing cells that could
+    not be read as a number and were set to NaN.
+    """
+    is_text = np.array(
+        [not pd.api.types.is_numeric_dtype(dtype) for dtype in frame.dtypes], dtype=bool
+    )
+    values = np.empty(frame.shape, dtype=np.float64)
+    if (~is_text).any():
+        values[:, ~is_text] = frame.loc[:, ~is_text].to_numpy(dtype=np.float64)
+    unparsed = 0
+    if is_text.any():
+        text = frame.loc[:, is_text]
+        missing = text.isna().to_numpy()
+        block = text.to_numpy(dtype=object, na_value="nan")
+        joined = _SEP.join(map(str, block.ravel()))
+        for suffix, exponent in SUFFIXES.items():
+            joined = joined.replace(suffix, exponent)
+        parsed = _to_floats(joined.split(_SEP)).reshape(block.shape)
+        unparsed = int((np.isnan(parsed) & ~missing).sum())
+        values[:, is_text] = parsed
+    return pd.DataFrame(values, index=frame.index, columns=frame.columns), unparsed
+
+
+def normalize_names(names):
+    """NFC-normalized, whitespace-collapsed country names.
+
+    Returns an object array with ``None`` for names that are not usable
+    ("", "undefined").
+    """
+    names = (
+        pd.Series(names, dtype="string")
+        .str.normalize("NFC")
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+    usable = names.notna() & ~names.str.lower().isin(["", "undefined", "nan"])
+    return np.where(usable.to_numpy(), names.to_numpy(dtype=object, na_value=None), None)
+
+
+def normalize_countries(frame):
+    """Normalize the country index of ``frame`` so the CSVs line up.
+
+    Names are NFC-normalized with whitespace collapsed, rows without a usable
+    name ("", "undefined") are dropped, and rows that collapse onto the same
+    name are merged, keeping the first non-missing value per year.
+    """
+    names = normalize_names(frame.index)
+    usable = pd.notna(names)
+    frame = frame[usable]
+    frame.index = pd.Index(names[usable], name="country")
+    if frame.index.has_duplicates:
+        frame = frame.groupby(level=0, sort=False).first()
+    return frame
+
+
+def numeric_table(frame):
+    """Float64 table indexed by normalized country from a frame read from a CSV.
+
+    ``frame`` has a ``country`` column followed by one column per year.
+    Returns ``(table, unparsed)`` as :func:`parse_suffixed` does.
+    """
+    frame = frame.set_index("country")
+    frame.columns = frame.columns.astype(int)
+    numeric, unparsed = parse_suffixed(frame)
+    return normalize_countries(numeric), unparsed
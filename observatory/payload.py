@@ -0,0 +1,120 @@
+"""Helpers for keeping what each view sends to the browser small.
+
+The landing page used to ship the whole ``country x ~300 year`` mortality
+table through ``st.dataframe`` and a choropleth keyed by full country names,
+which Plotly then has to match to geometries in the browser. The lean
+helpers here send ISO-3 codes, round values to the precision the view shows,
+and cut the raw table into pages server-side. ``payload_bytes`` measures
+what a view costs so the savings can be checked.
+"""
+import math
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from observatory.figures import spec_size
+from observatory.geo import COUNTRY_CODES
+
+# Decimals shown for each indicator in tooltips and tables
+DISPLAY_DECIMALS = {
+    "child_mortality": 1,
+    "life_expectancy": 1,
+    "population": 0,
+    "gdp_per_capita": 0,
+    "income": 2,
+    "school_years_men": 2,
+    "school_years_women": 2,
+}
+
+_shared_sizes = {}  # id(frame) -> payload_bytes, while the frame is alive
+
+
+def round_for_display(values, name):
+    """Round ``values`` to the decimals shown for indicator ``name``."""
+    return np.round(values, DISPLAY_DECIMALS.get(name, 2))
+
+
+def lean_slice(series, name, value_name=None):
+    """Frame of ``iso_alpha`` and rounded values for a choropleth.
+
+    ``series`` is a year slice indexed by country name; countries without a
+    known ISO-3 code are dropped.
+    """
+    codes = series.index.map(COUNTRY_CODES)
+    known = ~pd.isna(codes)
+    return pd.DataFrame({
+        "iso_alpha": codes[known],
+        value_name or name: round_for_display(series.to_numpy()[known], name),
+    })
+
+
+def lean_frame(frame, name, value_name=None):
+    """:func:`lean_slice` for a long frame with ``country`` and ``year`` columns.
+
+    Returns ``iso_alpha``, ``year`` and the rounded values.
+    """
+    codes = frame["country"].map(COUNTRY_CODES)
+    known = codes.notna().to_numpy()
+    return pd.DataFrame({
+        "iso_alpha": codes[known].to_numpy(),
+        "year": frame["year"].to_numpy()[known],
+        value_name or name: round_for_display(frame[name].to_numpy()[known], name),
+    })
+
+
+def page_count(frame, rows_per_page):
+    return max(1, math.ceil(len(frame) / rows_per_page))
+
+
+def table_page(frame, page, rows_per_page=25, columns=None, name=None):
+    """One page of rows of a wide table, limited to ``columns``.
+
+    ``page`` is 1-based. With ``name`` the values are rounded to that
+    indicator's display precision.
+    """
+    start = (page - 1) * rows_per_page
+    window = frame.iloc[start:start + rows_per_page]
+    if columns is not None:
+        window = window.loc[:, list(columns)]
+    if name is not None:
+        window = window.round(DISPLAY_DECIMALS.get(name, 2))
+    return window
+
+
+def payload_bytes(obj):
+    """Approximate bytes sent to the browser for ``obj``.
+
+    DataFrames are measured as the Arrow IPC stream Streamlit sends, figures
+    and chart specs as their JSON.
+    """
+    if isinstance(obj, pd.DataFrame):
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(obj)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().size
+    return spec_size(obj)
+
+
+def shared_payload_bytes(frame):
+    """:func:`payload_bytes` of a frame shared between reruns, measured once.
+
+    Encoding a whole table to Arrow just to report its size would cost every
+    rerun that shows it; the frame must not be modified afterwards.
+    """
+    key = id(frame)
+    size = _shared_sizes.get(key)
+    if size is None:
+        size = _shared_sizes[key] = payload_bytes(frame)
+        weakref.finalize(frame, _shared_sizes.pop, key, None)
+    return size
+
+
+def format_bytes(size):
+    for unit in ("B", "kB", "MB"):
+        if size < 1024 or unit == "MB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
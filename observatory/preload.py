@@ -0,0 +1,47 @@
+"""Background warm-up of the shared data for a fresh worker.
+
+The first rerun in a new process used to import pandas and NumPy and open
+(on a cold host, build) the store before Streamlit had sent anything to the
+browser. ``start_preload`` does that work, sets up the cube, panel,
+statistics and pyramid and starts the refresh watcher (``observatory.refresh``)
+in a daemon thread started at the top of every page.
+The page sends its title and introduction in the meantime and imports the
+data modules only afterwards; those imports and its own ``get_*`` calls then
+wait on the same locks for whatever is not finished yet.
+
+This module itself must stay cheap to import.
+"""
+import threading
+
+_lock = threading.Lock()
+_thread = None
+
+
+def _preload():
+    try:
+        from observatory.cube import get_cube
+        from observatory.downsample import get_pyramid
+        from observatory.panel import get_panel
+        from observatory.refresh import start_watcher
+        from observatory.stats import get_stats
+        from observatory.store import open_store
+
+        open_store()
+        get_cube()
+        get_panel()
+        get_stats()
+        get_pyramid()
+        start_watcher()
+    except Exception:
+        # The page's own call hits the same error and reports it
+        pass
+
+
+def start_preload():
+    """Start the warm-up thread once per process and return it."""
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_preload, name="observatory-preload", daemon=True)
+            _thread.start()
+        return _thread
@@ -0,0 +1,365 @@
+"""Incremental refresh of the indicator data in a running process.
+
+The store is opened once per process, so picking up a newer Gapminder CSV
+used to mean restarting every worker. The refresher here watches the
+sources behind the open store: the bundled CSVs by ``(mtime, size)`` and
+then SHA-256, and CSVs served from HuggingFace by the ``ETag`` and
+``Content-Length`` of a HEAD request. For a changed CSV it parses only the
+lines that differ from the last version it saw (the whole file when the
+header changed or no earlier version is known) and writes those countries
+into a copy of that indicator's matrix. Unchanged indicators keep sharing
+the memory-mapped store.
+
+Comparing old and new matrices gives the exact countries and years that
+changed (:class:`Changes`). The new store is swapped in together with the
+cube, panel, statistics and pyramid built on it, and only the derived
+results touched by the change are dropped: statistics and pyramid levels of
+other indicators are carried over, pyramid levels are rebucketed for the
+changed countries only, and cached figures are invalidated by what they
+declared they depend on. A rerun that is already running finishes on the
+objects it fetched; the next one sees the new version.
+
+New countries or years widen the axes (which never shrink while the process
+runs) and then every derived result is rebuilt.
+
+The watcher thread polls every ``OBSERVATORY_REFRESH_SECONDS`` (default 30,
+``0`` disables it) and asks HuggingFace at most every
+``OBSERVATORY_REMOTE_REFRESH_SECONDS`` (default 900).
+"""
+import csv
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from observatory import cube, downsample, loader, panel, stats, store
+from observatory.figures import figure_cache
+from observatory.parsing import normalize_names, numeric_table
+from observatory.tracing import stage
+
+REFRESH_SECONDS = float(os.environ.get("OBSERVATORY_REFRESH_SECONDS", "30"))
+REMOTE_REFRESH_SECONDS = float(os.environ.get("OBSERVATORY_REMOTE_REFRESH_SECONDS", "900"))
+# Files modified more recently than this may still be being written
+SETTLE_SECONDS = 2.0
+
+_lock = threading.Lock()
+_refresher = None
+_watcher = None
+
+
+class Changes:
+    """Countries and years whose values changed, per indicator."""
+
+    def __init__(self, cells=None, axes_changed=False):
+        self.cells = dict(cells or {})  # name -> (countries, years)
+        self.axes_changed = axes_changed
+
+    def __bool__(self):
+        return bool(self.axes_changed or self.cells)
+
+    def __repr__(self):
+        parts = [f"{name}: {len(c)} countries x {len(y)} years" for name, (c, y) in self.cells.items()]
+        if self.axes_changed:
+            parts.append("axes changed")
+        return f"Changes({', '.join(parts)})"
+
+    @property
+    def names(self):
+        return list(self.cells)
+
+    def countries(self, name):
+        return self.cells[name][0] if name in self.cells else frozenset()
+
+    def years(self, name):
+        return self.cells[name][1] if name in self.cells else frozenset()
+
+    def touches(self, indicators=None, years=None, countries=None):
+        """Whether data drawn from ``indicators``/``years``/``countries`` changed.
+
+        ``None`` stands for all indicators, years or countries.
+        """
+        if self.axes_changed:
+            return True
+        for name in self.cells if indicators is None else indicators:
+            if name not in self.cells:
+                continue
+            changed_countries, changed_years = self.cells[name]
+            if years is not None and changed_years.isdisjoint(int(year) for year in years):
+                continue
+            if countries is not None and changed_countries.isdisjoint(countries):
+                continue
+            return True
+        return False
+
+
+def _split(raw):
+    """Header line and non-empty data lines of a CSV."""
+    lines = [line.rstrip(b"\r") for line in raw.split(b"\n")]
+    return lines[0], [line for line in lines[1:] if line]
+
+
+def _country(line):
+    return next(csv.reader([line.decode("utf-8")]))[0]
+
+
+def _parse_lines(header, lines):
+    """``numeric_table`` of ``lines`` read under ``header``."""
+    return numeric_table(pd.read_csv(io.BytesIO(b"\n".join([header, *lines]))))
+
+
+def changed_rows(header, lines, previous):
+    """Table of the countries whose lines differ from ``previous``.
+
+    ``previous`` is ``(header, lines)`` of the last version seen. Countries
+    whose line was removed come back as all-NaN rows. Returns ``(table,
+    unparsed)``, where ``unparsed`` is the change in the count of cells that
+    could not be parsed, or ``None`` when a full parse is needed: the header
+    changed, or a changed country is spread over several lines that the
+    store merges.
+    """
+    old_header, old_lines = previous
+    if header != old_header:
+        return None
+    current = set(lines)
+    added = [line for line in lines if line not in old_lines]
+    removed = [line for line in old_lines if line not in current]
+    affected = {name for name in normalize_names([_country(line) for line in added + removed]) if name}
+    counts = Counter(normalize_names([_country(line) for line in lines]))
+    if any(counts[name] > 1 for name in affected):
+        return None
+    years = pd.read_csv(io.BytesIO(header)).columns[1:].astype(int)
+    table = pd.DataFrame(index=pd.Index([], name="country"), columns=years, dtype=np.float64)
+    unparsed = 0
+    if added:
+        table, unparsed = _parse_lines(header, added)
+    if removed:
+        unparsed -= _parse_lines(header, removed)[1]
+    return table.reindex(sorted(affected)), unparsed
+
+
+def apply_updates(current, updates, digests=None):
+    """Apply parsed tables to ``current`` and return ``(store, changes)``.
+
+    ``updates`` maps indicator names to ``(table, full, unparsed)``: a
+    country-indexed table with int year columns holding either every country
+    (``full``) or just the countries to overwrite, and the count of cells
+    that could not be parsed (for a partial table, the change in that
+    count). Indicators whose values did not change keep their matrix;
+    ``digests`` records the new source digests.
+    """
+    countries, years = current.countries, current.years
+    tables = [table for table, _, _ in updates.values()]
+    new_countries = set().union(*(table.index for table in tables)) - set(countries)
+    table_years = set().union(*(table.columns for table in tables))
+    first = min([years[0], *table_years])
+    last = max([years[-1], *table_years])
+    axes_changed = bool(new_countries) or bool(first < years[0] or last > years[-1])
+    if axes_changed:
+        countries = pd.Index(sorted(set(countries) | new_countries), name="country")
+        years = np.arange(first, last + 1)
+        rows = countries.get_indexer(current.countries)
+        columns = np.searchsorted(years, current.years)
+
+    matrices = {}
+    for name in current.names:
+        matrix = current.matrix(name)
+        if axes_changed:
+            widened = np.full((len(countries), len(years)), np.nan, dtype=store.DTYPE)
+            widened[np.ix_(rows, columns)] = matrix
+            matrix = widened
+        matrices[name] = matrix
+
+    cells = {}
+    unparsed = dict(current.unparsed)
+    for name, (table, full, count) in updates.items():
+        unparsed[name] = count if full else unparsed.get(name, 0) + count
+        old = matrices[name]
+        if full:
+            new = table.reindex(index=countries, columns=years).to_numpy(dtype=store.DTYPE)
+        else:
+            new = np.array(old, dtype=store.DTYPE)
+            new[countries.get_indexer(table.index)] = table.reindex(columns=years).to_numpy(dtype=store.DTYPE)
+        differs = (old != new) & ~(np.isnan(old) & np.isnan(new))
+        if differs.any():
+            cells[name] = (
+                frozenset(countries[differs.any(axis=1)]),
+                frozenset(int(year) for year in years[differs.any(axis=0)]),
+            )
+            matrices[name] = new
+
+    sources = dict(current.sources)
+    sources.update(digests or {})
+    refreshed = store.IndicatorStore(countries, years, matrices, unparsed=unparsed, sources=sources)
+    return refreshed, Changes(cells, axes_changed)
+
+
+def swap(current, refreshed, changes):
+    """Install ``refreshed`` and its derived objects in place of ``current``.
+
+    Returns the number of cached figures dropped.
+    """
+    old_stats, old_pyramid = stats._stats, downsample._pyramid
+    new_cube = cube.IndicatorCube(refreshed)
+    new_panel = panel.Panel(refreshed)
+    new_stats = old_stats.updated(refreshed, changes) if old_stats is not None else None
+    new_pyramid = old_pyramid.updated(refreshed, changes) if old_pyramid is not None else None
+    # Same order as the get_* functions take them (derived first, then the store)
+    with cube._lock, panel._lock, stats._lock, downsample._lock, store._lock:
+        if store._open is not current:
+            raise RuntimeError("The store was replaced during the refresh")
+        store._open = refreshed
+        cube._cube = new_cube
+        panel._panel = new_panel
+        stats._stats = new_stats
+        downsample._pyramid = new_pyramid
+    return figure_cache.invalidate_changes(changes)
+
+
+class Refresher:
+    """Watches the CSVs behind the open store and applies their changes."""
+
+    def __init__(self, remote_interval=REMOTE_REFRESH_SECONDS):
+        self.remote_interval = remote_interval
+        self.refreshes = 0
+        self.last_changes = Changes()
+        self._seen = None  # name -> {"signature", "digest", "lines"}
+        self._remote_checked = 0.0
+        self._lock = threading.Lock()
+
+    def _baseline(self, current):
+        """Record the version of each source the open store was built from."""
+        self._seen = {}
+        for name in loader.INDICATORS:
+            seen = {"signature": None, "digest": current.sources.get(name), "lines": None}
+            path = loader.local_path(name)
+            if os.path.exists(path):
+                signature = loader._signature(path)
+                with open(path, "rb") as fh:
+                    raw = fh.read()
+                if hashlib.sha256(raw).hexdigest() == seen["digest"]:
+                    seen.update(signature=signature, lines=_lines(raw))
+            else:
+                try:
+                    seen["signature"] = loader.remote_signature(name)
+                except OSError:
+                    pass
+            self._seen[name] = seen
+        self._remote_checked = time.monotonic()
+
+    def _changed_sources(self, remote):
+        """``{name: (raw, signature, digest)}`` for sources whose content changed."""
+        changed = {}
+        now = time.time()
+        for name, seen in self._seen.items():
+            path = loader.local_path(name)
+            if os.path.exists(path):
+                signature = loader._signature(path)
+                if signature == seen["signature"] or now - signature[0] / 1e9 < SETTLE_SECONDS:
+                    continue
+                with open(path, "rb") as fh:
+                    raw = fh.read()
+            elif remote:
+                try:
+                    signature = loader.remote_signature(name)
+                    if signature == seen["signature"]:
+                        continue
+                    raw, _ = loader.read_source(name)
+                except OSError:
+                    continue
+            else:
+                continue
+            digest = hashlib.sha256(raw).hexdigest()
+            if digest == seen["digest"]:
+                seen["signature"] = signature
+                continue
+            changed[name] = (raw, signature, digest)
+        return changed
+
+    def refresh(self, remote=None):
+        """Check every source once and apply what changed.
+
+        ``remote`` forces (or skips) the HEAD requests to HuggingFace; by
+        default they are made every ``remote_interval`` seconds. Local files
+        modified in the last ``SETTLE_SECONDS`` are left for the next check.
+        Returns the :class:`Changes` applied, empty when nothing changed.
+        """
+        with self._lock:
+            current = store.open_store()
+            if self._seen is None:
+                self._baseline(current)
+            if remote is None:
+                remote = time.monotonic() - self._remote_checked >= self.remote_interval
+            if remote:
+                self._remote_checked = time.monotonic()
+            changed = self._changed_sources(remote)
+            if not changed:
+                return Changes()
+
+            updates, seen = {}, {}
+            with stage("clean"):
+                for name, (raw, signature, digest) in changed.items():
+                    header, lines = _split(raw)
+                    previous = self._seen[name]["lines"]
+                    partial = changed_rows(header, lines, previous) if previous is not None else None
+                    if partial is None:
+                        table, unparsed = numeric_table(pd.read_csv(io.BytesIO(raw)))
+                        updates[name] = (table, True, unparsed)
+                    else:
+                        updates[name] = (partial[0], False, partial[1])
+                    seen[name] = {"signature": signature, "digest": digest, "lines": (header, set(lines))}
+            with stage("reshape"):
+                refreshed, changes = apply_updates(current, updates, {n: s["digest"] for n, s in seen.items()})
+            if changes:
+                swap(current, refreshed, changes)
+            self._seen.update(seen)
+            for name in changed:
+                loader.forget(name)
+            if changes:
+                self.refreshes += 1
+                self.last_changes = changes
+            return changes
+
+
+def _lines(raw):
+    header, lines = _split(raw)
+    return header, set(lines)
+
+
+def get_refresher():
+    """Return the process-wide :class:`Refresher`."""
+    global _refresher
+    with _lock:
+        if _refresher is None:
+            _refresher = Refresher()
+        return _refresher
+
+
+def refresh(remote=None):
+    """Apply any source changes now (see :meth:`Refresher.refresh`)."""
+    return get_refresher().refresh(remote)
+
+
+def _watch(interval):
+    refresher = get_refresher()
+    while True:
+        time.sleep(interval)
+        try:
+            refresher.refresh()
+        except Exception:
+            # A file caught mid-write fails to parse; the next check retries
+            pass
+
+
+def start_watcher(interval=REFRESH_SECONDS):
+    """Start the polling thread once per process; ``interval <= 0`` disables it."""
+    global _watcher
+    with _lock:
+        if _watcher is None and interval > 0:
+            _watcher = threading.Thread(target=_watch, args=(interval,), name="observatory-refresh", daemon=True)
+            _watcher.start()
+        return _watcher
@@ -0,0 +1,242 @@
+"""Precomputed cross-year statistics over the indicator store.
+
+The GDP page asked Vega-Lite to fit a regression in the browser on every
+render, and neither scatter page offered anything across years. Everything
+here is computed once per process with NumPy over the whole
+``countries x years`` matrix at once (one column per year, no Python loop
+over years) and kept in the stats object's cache:
+
+* ``regression`` - least-squares fit of an indicator against the log10 of
+  another for every year: slope, intercept, R² and the number of countries,
+  over all countries or only the top N by the x indicator.
+* ``percentiles`` - per-year percentiles, worldwide or per region.
+* ``ranking`` / ``top_n`` - countries ordered by an indicator for every year,
+  worldwide or within one region.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from observatory.geo import region
+from observatory.store import open_store, widen
+
+PERCENTILES = (10, 25, 50, 75, 90)
+MIN_COUNTRIES = 3
+
+_lock = threading.Lock()
+_stats = None
+
+
+def fit_columns(x, y):
+    """Least-squares fit of ``y`` on ``x`` for every column at once.
+
+    ``x`` and ``y`` are ``countries x years`` arrays; non-finite cells are
+    ignored. Returns ``(slope, intercept, r2, n)`` arrays with one entry per
+    column, NaN where fewer than ``MIN_COUNTRIES`` points are available.
+    """
+    valid = np.isfinite(x) & np.isfinite(y)
+    n = valid.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_x = np.where(valid, x, 0.0).sum(axis=0) / n
+        mean_y = np.where(valid, y, 0.0).sum(axis=0) / n
+        dx = np.where(valid, x - mean_x, 0.0)
+        dy = np.where(valid, y - mean_y, 0.0)
+        sxx = (dx * dx).sum(axis=0)
+        sxy = (dx * dy).sum(axis=0)
+        syy = (dy * dy).sum(axis=0)
+        slope = sxy / sxx
+        intercept = mean_y - slope * mean_x
+        r2 = sxy * sxy / (sxx * syy)
+    too_few = n < MIN_COUNTRIES
+    for values in (slope, intercept, r2):
+        values[too_few] = np.nan
+    return slope, intercept, r2, n
+
+
+class IndicatorStats:
+    """Statistics over one store, computed on first use and cached."""
+
+    def __init__(self, store):
+        self.store = store
+        self.years = store.years
+        self._positions = {int(year): i for i, year in enumerate(self.years)}
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, key, compute):
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = compute()
+            return self._cache[key]
+
+    def updated(self, store, changes):
+        """Stats over ``store`` keeping the results ``changes`` leave intact.
+
+        Cached results that only involve unchanged indicators are carried
+        over when the country and year axes are the same.
+        """
+        stats = IndicatorStats(store)
+        if not changes.axes_changed:
+            with self._lock:
+                for key, value in self._cache.items():
+                    names = {part for part in key[1:] if isinstance(part, str)}
+                    if not names & set(changes.names):
+                        stats._cache[key] = value
+        return stats
+
+    def _in_region(self, name):
+        """Boolean mask of the store rows whose country is in region ``name``."""
+        return self._cached(
+            ("region", name),
+            lambda: np.array([region(country) == name for country in self.store.countries], dtype=bool),
+        )
+
+    def _matrix(self, name):
+        return widen(self.store.matrix(name))
+
+    def regression(self, x_name, y_name, top=None):
+        """Per-year fit of ``y_name`` against ``log10(x_name)``.
+
+        With ``top`` only the ``top`` countries with the highest ``x_name``
+        (among those that have both indicators) enter each year's fit.
+        Returns a frame indexed by year with ``slope``, ``intercept``, ``r2``
+        and ``n`` columns.
+        """
+        def compute():
+            raw_x = self._matrix(x_name)
+            y = self._matrix(y_name)
+            if top is not None:
+                valid = ~np.isnan(raw_x) & ~np.isnan(y)
+                order = np.argsort(np.where(valid, -raw_x, np.inf), axis=0, kind="stable")
+                ranks = np.empty_like(order)
+                np.put_along_axis(ranks, order, np.arange(len(order))[:, None], axis=0)
+                raw_x = np.where(valid & (ranks < top), raw_x, np.nan)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                x = np.log10(raw_x)
+            slope, intercept, r2, n = fit_columns(x, y)
+            return pd.DataFrame(
+                {"slope": slope, "intercept": intercept, "r2": r2, "n": n},
+                index=pd.Index(self.years, name="year"),
+            )
+
+        return self._cached(("regression", x_name, y_name, top), compute)
+
+    def fitted_lines(self, x_name, y_name, x_range, top=None, points=2):
+        """Points on the fitted curves between each year's ``min`` and ``max``.
+
+        ``x_range`` is a frame indexed by year with ``min`` and ``max``
+        columns. The fit is linear in log10(x), so two points draw it exactly
+        on a log-scaled axis. Returns a long frame with ``year``, ``x_name``
+        and ``y_name``; years without a fit are left out.
+        """
+        fit = self.regression(x_name, y_name, top).loc[x_range.index]
+        low = np.log10(x_range["min"].to_numpy(dtype=float))
+        high = np.log10(x_range["max"].to_numpy(dtype=float))
+        log_x = low[:, None] + (high - low)[:, None] * np.linspace(0, 1, points)
+        y = fit["intercept"].to_numpy()[:, None] + fit["slope"].to_numpy()[:, None] * log_x
+        frame = pd.DataFrame({
+            "year": np.repeat(x_range.index.to_numpy(), points),
+            x_name: 10 ** log_x.ravel(),
+            y_name: y.ravel(),
+        })
+        return frame.dropna(ignore_index=True)
+
+    def fitted_line(self, x_name, y_name, year, x_min, x_max, top=None, points=2):
+        """:meth:`fitted_lines` for one year, without the ``year`` column."""
+        x_range = pd.DataFrame({"min": [x_min], "max": [x_max]}, index=[int(year)])
+        return self.fitted_lines(x_name, y_name, x_range, top, points).drop(columns="year")
+
+    def percentiles(self, name, by_region=False):
+        """Per-year percentiles (``PERCENTILES``) of ``name``.
+
+        Worldwide the frame is indexed by year with one column per
+        percentile; ``by_region`` adds a ``region`` level to the index.
+        """
+        def compute():
+            matrix = self._matrix(name)
+            if not by_region:
+                groups = {None: np.arange(matrix.shape[0])}
+            else:
+                regions = np.array([region(c) for c in self.store.countries], dtype=object)
+                groups = {
+                    r: np.flatnonzero(regions == r)
+                    for r in sorted({r for r in regions if r is not None})
+                }
+            frames = []
+            for label, rows in groups.items():
+                block = matrix[rows]
+                values = np.full((len(PERCENTILES), block.shape[1]), np.nan)
+                has_data = ~np.isnan(block).all(axis=0)
+                if has_data.any():
+                    values[:, has_data] = np.nanpercentile(block[:, has_data], PERCENTILES, axis=0)
+                frame = pd.DataFrame(values.T, index=pd.Index(self.years, name="year"),
+                                     columns=[f"p{q}" for q in PERCENTILES])
+                if by_region:
+                    frame.insert(0, "region", label)
+                frames.append(frame)
+            result = pd.concat(frames)
+            return result.set_index("region", append=True).swaplevel() if by_region else result
+
+        return self._cached(("percentiles", name, by_region), compute)
+
+    def ranking(self, name, region=None):
+        """Country positions ordered by ``name`` descending, for every year.
+
+        Returns an int array shaped like the store matrix; column ``j`` lists
+        the row positions for year ``j`` with missing values last. With
+        ``region`` the countries outside it are placed last as well.
+        """
+        # Outside compute(), which runs under the cache lock
+        in_region = self._in_region(region) if region is not None else None
+
+        def compute():
+            matrix = self._matrix(name)
+            missing = np.isnan(matrix)
+            if in_region is not None:
+                missing |= ~in_region[:, None]
+            return np.argsort(np.where(missing, np.inf, -matrix), axis=0, kind="stable")
+
+        return self._cached(("ranking", name, region), compute)
+
+    def top_n_frames(self, name, n, among=(), years=None, region=None):
+        """The ``n`` countries with the highest ``name`` in each of ``years``.
+
+        Only countries that also have every indicator in ``among`` for a year
+        are considered in it, and with ``region`` only that region's. All years are picked in one pass over the
+        ranking. Returns a long frame with ``country``, ``year``, ``name`` and
+        the ``among`` columns, ordered by year and then highest first.
+        """
+        if years is None:
+            columns = np.arange(len(self.years))
+        else:
+            columns = np.array([self._positions[int(year)] for year in years], dtype=np.int64)
+        names = [name, *among]
+        order = self.ranking(name, region)[:, columns]
+        present = np.ones(order.shape, dtype=bool)
+        if region is not None:
+            present &= self._in_region(region)[order]
+        for other in names:
+            present &= ~np.isnan(self.store.matrix(other)[order, columns])
+        keep = present & (np.cumsum(present, axis=0) <= n)
+        picked, ranks = np.nonzero(keep.T)
+        rows, columns = order[ranks, picked], columns[picked]
+        frame = pd.DataFrame({
+            other: widen(self.store.matrix(other)[rows, columns]) for other in names
+        })
+        frame.insert(0, "country", self.store.countries[rows])
+        frame.insert(1, "year", self.years[columns])
+        return frame
+
+    def top_n(self, name, year, n, among=(), region=None):
+        """:meth:`top_n_frames` for one year, without the ``year`` column."""
+        return self.top_n_frames(name, n, among, years=[year], region=region).drop(columns="year")
+
+
+def get_stats():
+    """Return the process-wide :class:`IndicatorStats`."""
+    global _stats
+    with _lock:
+        if _stats is None:
+            _stats = IndicatorStats(open_store())
+        return _stats
@@ -0,0 +1,270 @@
+"""Precompiled binary store of the indicator tables.
+
+Parsing the wide CSVs (country x ~300 year columns, some with "3.28M"-style
+strings) is the bulk of a cold start. ``build_store`` converts every
+indicator once into a float32 ``.npy`` matrix laid out on a shared country
+index and year axis. ``open_store`` memory-maps those files read-only, so the
+Streamlit worker processes on a host share one copy through the page cache
+instead of each holding its own parsed frames.
+
+Each build lives in ``store/<build_id>/``, where ``build_id`` is derived
+from the SHA-256 of every source CSV. A changed CSV therefore maps to a new
+directory and an out-of-date store is never read. Builds are written to a
+temporary directory and renamed into place, so workers racing to build the
+same version end up sharing whichever copy landed first.
+
+The store lives in ``store/`` next to the CSVs unless
+``OBSERVATORY_STORE_DIR`` points elsewhere. Build ahead of deployment with::
+
+    python -m observatory.store build
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from observatory import loader
+from observatory.parsing import numeric_table
+from observatory.tracing import stage
+
+STORE_DIR = os.environ.get("OBSERVATORY_STORE_DIR") or os.path.join(loader.DATA_DIR, "store")
+MANIFEST = "manifest.json"
+DTYPE = np.float32
+# Bump when the build output changes for the same sources.
+FORMAT_VERSION = 3
+
+_lock = threading.Lock()
+_open = None
+
+
+def widen(values):
+    """Convert float32 store values to float64 without float32 noise.
+
+    The sources carry at most a few significant digits, so rounding to the
+    seven float32 can hold turns 91.59999847 back into 91.6 for tooltips and
+    tables.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        magnitude = np.floor(np.log10(np.abs(values)))
+    digits = 6 - np.nan_to_num(magnitude, nan=0.0, posinf=0.0, neginf=0.0)
+    scale = 10.0 ** digits
+    return np.round(values * scale) / scale
+
+
+class IndicatorStore:
+    """Read-only view of one store build."""
+
+    def __init__(self, countries, years, matrices, build_id=None, unparsed=None, sources=None):
+        self.countries = pd.Index(countries, name="country")
+        self.years = np.asarray(years, dtype=np.int64)
+        self.build_id = build_id
+        self.unparsed = dict(unparsed or {})
+        # SHA-256 of the CSV content each indicator was built from, if known
+        self.sources = dict(sources or {})
+        self._matrices = matrices
+        self._frames = {}
+
+    @property
+    def names(self):
+        return list(self._matrices)
+
+    def matrix(self, name):
+        """The ``countries x years`` float32 matrix for ``name``."""
+        return self._matrices[name]
+
+    def frame(self, name, widened=False):
+        """Wide frame for ``name`` indexed by country, one column per year.
+
+        The frame wraps the store matrix without copying it. With
+        ``widened`` it holds a float64 copy passed through :func:`widen`
+        instead, for tables that show the values as they are.
+        """
+        key = (name, widened)
+        frame = self._frames.get(key)
+        if frame is None:
+            matrix = self._matrices[name]
+            frame = pd.DataFrame(
+                widen(matrix) if widened else matrix,
+                index=self.countries,
+                columns=[str(year) for year in self.years],
+                copy=False,
+            )
+            self._frames[key] = frame
+        return frame
+
+
+def _source_digests():
+    return {name: loader.source_digest(name) for name in loader.INDICATORS}
+
+
+def _build_id(digests):
+    joined = "\n".join(f"{name}:{digests[name]}" for name in sorted(digests))
+    joined += f"\nformat:{FORMAT_VERSION}"
+    return hashlib.sha256(joined.encode()).hexdigest()[:16]
+
+
+def _numeric_tables():
+    """Parse every indicator into a numeric frame indexed by country.
+
+    Returns ``(tables, unparsed)`` with the per-indicator count of cells the
+    suffix parser had to drop.
+    """
+    tables = {}
+    unparsed = {}
+    for name in loader.INDICATORS:
+        with stage("fetch"):
+            frame = loader.load_indicator(name)
+        with stage("clean"):
+            tables[name], unparsed[name] = numeric_table(frame)
+    return tables, unparsed
+
+
+def _align(tables):
+    """Lay every table out on the union of countries and years."""
+    countries = sorted(set().union(*(t.index for t in tables.values())))
+    all_years = set().union(*(t.columns for t in tables.values()))
+    years = np.arange(min(all_years), max(all_years) + 1)
+    matrices = {
+        name: table.reindex(index=countries, columns=years).to_numpy(dtype=DTYPE)
+        for name, table in tables.items()
+    }
+    return countries, years, matrices
+
+
+def build_store(store_dir=STORE_DIR):
+    """Convert every indicator CSV into the binary store.
+
+    Returns the path of the build directory. Nothing is written when a build
+    for the current sources already exists.
+    """
+    digests = _source_digests()
+    build_id = _build_id(digests)
+    target = os.path.join(store_dir, build_id)
+    if os.path.exists(os.path.join(target, MANIFEST)):
+        return target
+
+    tables, unparsed = _numeric_tables()
+    with stage("reshape"):
+        countries, years, matrices = _align(tables)
+    os.makedirs(store_dir, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".build-", dir=store_dir)
+    os.chmod(tmp, 0o755)
+    try:
+        for name, matrix in matrices.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), matrix)
+        manifest = {
+            "build_id": build_id,
+            "dtype": np.dtype(DTYPE).name,
+            "countries": list(countries),
+            "years": [int(y) for y in years],
+            "sources": digests,
+            "indicators": list(matrices),
+            "unparsed": unparsed,
+        }
+        with open(os.path.join(tmp, MANIFEST), "w") as fh:
+            json.dump(manifest, fh)
+        try:
+            os.rename(tmp, target)
+        except OSError:
+            # Another process finished the same build first.
+            if not os.path.exists(os.path.join(target, MANIFEST)):
+                raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return target
+
+
+def prune_store(store_dir=STORE_DIR, keep=None):
+    """Remove build directories other than ``keep``."""
+    if not os.path.isdir(store_dir):
+        return
+    for entry in os.listdir(store_dir):
+        if entry != keep:
+            shutil.rmtree(os.path.join(store_dir, entry), ignore_errors=True)
+
+
+def _map_build(path):
+    with open(os.path.join(path, MANIFEST)) as fh:
+        manifest = json.load(fh)
+    matrices = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        for name in manifest["indicators"]
+    }
+    return IndicatorStore(
+        manifest["countries"],
+        manifest["years"],
+        matrices,
+        manifest["build_id"],
+        manifest.get("unparsed"),
+        manifest.get("sources"),
+    )
+
+
+def _in_memory():
+    tables, unparsed = _numeric_tables()
+    with stage("reshape"):
+        countries, years, matrices = _align(tables)
+    sources = {name: loader.content_hash(name) for name in matrices}
+    return IndicatorStore(countries, years, matrices, unparsed=unparsed, sources=sources)
+
+
+def open_store(store_dir=STORE_DIR, build_missing=True):
+    """Return the process-wide :class:`IndicatorStore`.
+
+    When the local CSVs are present the matching build is memory-mapped,
+    building it first if ``build_missing`` is set. Without local CSVs (or
+    when the store directory is not writable) the indicators are parsed into
+    memory instead.
+    """
+    global _open
+    with _lock:
+        if _open is not None:
+            return _open
+        digests = _source_digests()
+        store = None
+        if all(digests.values()):
+            target = os.path.join(store_dir, _build_id(digests))
+            if not os.path.exists(os.path.join(target, MANIFEST)) and build_missing:
+                try:
+                    build_store(store_dir)
+                except OSError:
+                    pass
+            if os.path.exists(os.path.join(target, MANIFEST)):
+                store = _map_build(target)
+        if store is None:
+            store = _in_memory()
+        _open = store
+        return store
+
+
+def indicator_frame(name, widened=False):
+    """Wide frame for ``name`` from the shared store (see ``IndicatorStore.frame``)."""
+    return open_store().frame(name, widened)
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    if args[:1] != ["build"]:
+        print("usage: python -m observatory.store build [--prune]")
+        return 2
+    target = build_store()
+    if "--prune" in args:
+        prune_store(keep=os.path.basename(target))
+    with open(os.path.join(target, MANIFEST)) as fh:
+        unparsed = json.load(fh).get("unparsed", {})
+    for name, count in unparsed.items():
+        if count:
+            print(f"{name}: {count} cells could not be parsed")
+    print(f"store written to {target}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""Per-rerun stage timing for the page scripts.
+
+Each page calls ``start_run`` at the top, wraps its work in ``stage(...)``
+blocks and ends with ``finish_run`` (through ``observatory.debug``):
+
+* ``load`` - getting the shared store, cube, panel or statistics
+* ``filter`` - selecting the year, countries or range for the view
+* ``chart`` - building the Plotly figure or Altair chart
+* ``serialize`` - turning an Altair chart into its Vega-Lite dict
+* ``render`` - handing data or specs to Streamlit
+
+When the store has to be built, ``load`` also contains the ``fetch`` (local
+or HuggingFace CSV), ``clean`` (suffix parsing, country names) and
+``reshape`` (alignment onto the shared axes) stages of the build.
+
+Timings and resident-memory deltas are kept on the current thread's run
+(Streamlit runs each session's script in its own thread) and passed to any
+registered listeners, which is how the benchmarks collect them. Every stage
+and every finished rerun is also counted in a per-page histogram. Setting
+``OBSERVATORY_METRICS_FILE`` writes those histograms, and the figure cache's
+size, hit and eviction counters, in the Prometheus text format at most every ``OBSERVATORY_METRICS_INTERVAL`` seconds (default 10)
+and once more at exit, ready for a node exporter's textfile collector or a
+plain ``cat``.
+"""
+import atexit
+import bisect
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from observatory.figures import figure_cache
+
+# Upper bounds in seconds; the last bucket is +Inf
+BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0)
+METRICS_FILE = os.environ.get("OBSERVATORY_METRICS_FILE", "")
+METRICS_INTERVAL = float(os.environ.get("OBSERVATORY_METRICS_INTERVAL", "10"))
+
+_local = threading.local()
+_listeners = []
+_metrics_lock = threading.Lock()
+_histograms = {}  # (page, stage) -> Histogram
+_last_write = 0.0
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def _rss():
+    """Resident set size in bytes, or ``None`` where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Histogram:
+    """Counts of durations per ``BUCKETS`` bound, plus their sum."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q):
+        """Upper bucket bound below which a ``q`` share of samples fall."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip((*BUCKETS, float("inf")), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+class Trace:
+    """Stage timings and memory deltas for one script run."""
+
+    def __init__(self, page):
+        self.page = page
+        self.started = time.perf_counter()
+        self.finished = None
+        self.stages = {}
+        self.memory = {}
+
+    def add(self, name, seconds, memory=None):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        if memory is not None:
+            self.memory[name] = self.memory.get(name, 0) + memory
+
+    @property
+    def elapsed(self):
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return end - self.started
+
+
+def start_run(page):
+    """Begin timing a rerun of ``page`` on the current thread."""
+    trace = Trace(page)
+    _local.trace = trace
+    return trace
+
+
+def current_run():
+    """The trace for the current thread's run, if one was started."""
+    return getattr(_local, "trace", None)
+
+
+def finish_run():
+    """Close the current run, count its total and return it (or ``None``)."""
+    trace = current_run()
+    if trace is None or trace.finished is not None:
+        return trace
+    trace.finished = time.perf_counter()
+    _observe(trace.page, "rerun", trace.elapsed)
+    if METRICS_FILE:
+        maybe_write_metrics(METRICS_FILE)
+    return trace
+
+
+def add_listener(listener):
+    """Call ``listener(page, stage, seconds)`` for every finished stage."""
+    _listeners.append(listener)
+
+
+def remove_listener(listener):
+    _listeners.remove(listener)
+
+
+def _observe(page, name, seconds):
+    key = (page or "background", name)
+    with _metrics_lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as ``name`` on the current run."""
+    rss = _rss()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        after = _rss() if rss is not None else None
+        memory = after - rss if after is not None else None
+        trace = current_run()
+        page = trace.page if trace is not None else None
+        if trace is not None:
+            trace.add(name, seconds, memory)
+        _observe(page, name, seconds)
+        for listener in list(_listeners):
+            listener(page, name, seconds)
+
+
+def histograms():
+    """Snapshot of ``{(page, stage): Histogram}``."""
+    with _metrics_lock:
+        snapshot = {}
+        for key, histogram in _histograms.items():
+            copy = Histogram()
+            copy.counts, copy.count, copy.sum = list(histogram.counts), histogram.count, histogram.sum
+            snapshot[key] = copy
+        return snapshot
+
+
+def reset_histograms():
+    with _metrics_lock:
+        _histograms.clear()
+
+
+def format_metrics():
+    """The histograms and figure cache counters in the Prometheus text exposition format."""
+    lines = [
+        "# HELP observatory_stage_seconds Time spent per page script stage.",
+        "# TYPE observatory_stage_seconds histogram",
+    ]
+    for (page, name), histogram in sorted(histograms().items()):
+        labels = f'page="{page}",stage="{name}"'
+        cumulative = 0
+        for bound, count in zip((*BUCKETS, "+Inf"), histogram.counts):
+            cumulative += count
+            lines.append(f'observatory_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"observatory_stage_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+        lines.append(f"observatory_stage_seconds_count{{{labels}}} {histogram.count}")
+    cache = figure_cache.stats()
+    for name, kind, value, help_text in (
+        ("entries", "gauge", cache["entries"], "Specs held by the figure cache."),
+        ("bytes", "gauge", cache["bytes"], "Serialized size of the cached specs."),
+        ("max_bytes", "gauge", cache["max_bytes"], "Byte budget of the figure cache."),
+        ("hits_total", "counter", cache["hits"], "Figure cache lookups that found a spec."),
+        ("misses_total", "counter", cache["misses"], "Figure cache lookups that found nothing."),
+        ("evictions_total", "counter", cache["evictions"], "Specs evicted to stay within the budget."),
+        ("hit_ratio", "gauge", f"{cache['hit_rate']:.6f}", "Share of figure cache lookups that hit."),
+    ):
+        lines.append(f"# HELP observatory_figure_cache_{name} {help_text}")
+        lines.append(f"# TYPE observatory_figure_cache_{name} {kind}")
+        lines.append(f"observatory_figure_cache_{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path):
+    """Write ``format_metrics()`` to ``path`` atomically."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".metrics-", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as fh:
+            fh.write(format_metrics())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def maybe_write_metrics(path, interval=METRICS_INTERVAL):
+    """Write the metrics file unless it was written in the last ``interval`` seconds."""
+    global _last_write
+    now = time.monotonic()
+    with _metrics_lock:
+        if now - _last_write < interval:
+            return False
+        _last_write = now
+    try:
+        write_metrics(path)
+    except OSError:
+        return False
+    return True
+
+
+def _flush_metrics():
+    if METRICS_FILE and _histograms:
+        try:
+            write_metrics(METRICS_FILE)
+        except OSError:
+            pass
+
+
+atexit.register(_flush_metrics)
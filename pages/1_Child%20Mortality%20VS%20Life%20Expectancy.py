@@ -1,9 +1,11 @@
-import pandas as pd
 import streamlit as st
-import altair as alt
 
-child_mortality = pd.read_csv("https://huggingface.co/spaces/jiyachachan/fp2/resolve/main/child_mortality_0_5_year_olds_dying_per_1000_born.csv")
-life_expectancy = pd.read_csv("https://huggingface.co/spaces/jiyachachan/fp2/resolve/main/life_expectancy.csv")
+from observatory.debug import finish_page
+from observatory.preload import start_preload
+from observatory.tracing import stage, start_run
+
+start_run("life_expectancy")
+start_preload()
 
 st.title("Interactive Observatory: Child Mortality & Life Expectancy")
 st.write("""
@@ -16,23 +18,24 @@ medicine, and recent advancements in healthcare and living standards, while also
 years with limited historical data to provide a broader context.
 """)
 
-countries = list(child_mortality['country'].unique())
-selected_countries = st.sidebar.multiselect("Select Countries", countries, default=["Argentina", "Australia", "China", "India", "South Africa", "UK", "USA"])
-year_range = st.sidebar.slider("Select Year Range", 1900, 2024, (1900, 2024))
+with stage("load"):
+    from observatory.charts import to_spec
+    from observatory.downsample import get_pyramid
+    from observatory.figures import figure_cache
+    from observatory.panel import get_panel
 
-filtered_mortality = child_mortality[child_mortality['country'].isin(selected_countries)]
-filtered_expectancy = life_expectancy[life_expectancy['country'].isin(selected_countries)]
-years = [str(year) for year in range(year_range[0], year_range[1] + 1)]
-filtered_mortality = filtered_mortality[['country'] + years]
-filtered_expectancy = filtered_expectancy[['country'] + years]
+    generation = figure_cache.generation
+    panel = get_panel()
+    pyramid = get_pyramid()
 
-def melt_dataframe(df, value_name):
-    df_melted = df.melt(id_vars=["country"], var_name="year", value_name=value_name)
-    df_melted["year"] = df_melted["year"].astype(int)
-    return df_melted
+countries = panel.countries_with("child_mortality")
+selected_countries = st.sidebar.multiselect("Select Countries", countries, default=["Argentina", "Australia", "China", "India", "South Africa", "UK", "USA"])
+year_range = st.sidebar.slider("Select Year Range", 1900, 2024, (1900, 2024))
 
-mortality_melted = melt_dataframe(filtered_mortality, "Child Mortality")
-expectancy_melted = melt_dataframe(filtered_expectancy, "Life Expectancy")
+# Rendered charts are cached per country set and year range
+chart_state = {"countries": sorted(selected_countries), "years": year_range}
+# What the cached charts are built from, so a data refresh only drops the ones it touches
+chart_data = {"countries": chart_state["countries"], "years": range(year_range[0], year_range[1] + 1)}
 
 # Chart 1: Child Mortality Trends
 st.subheader("Chart 1: Child Mortality Trends")
@@ -46,13 +49,28 @@ Africa during the mid-20th century. Over time, all countries demonstrate a marke
 indicating progress in global health and development.
 """)
 
-mortality_chart = alt.Chart(mortality_melted).mark_line().encode(
-    x=alt.X("year:O", title="Year"),
-    y=alt.Y("Child Mortality:Q", title="Child Mortality (0–5 years per 1000 births)"),
-    color="country:N"
-).properties(width=700, height=400)
+def build_mortality_chart():
+    import altair as alt
 
-st.altair_chart(mortality_chart)
+    # Many countries or long ranges are drawn from the min/max pyramid to bound the point count
+    with stage("filter"):
+        mortality = pyramid.frame("child_mortality", chart_state["countries"], year_range)
+        mortality = mortality.rename(columns={"child_mortality": "Child Mortality"})
+    with stage("chart"):
+        chart = alt.Chart(mortality).mark_line().encode(
+            x=alt.X("year:Q", title="Year", axis=alt.Axis(format="d")),
+            y=alt.Y("Child Mortality:Q", title="Child Mortality (0–5 years per 1000 births)"),
+            color="country:N"
+        ).properties(width=700, height=400)
+    with stage("serialize"):
+        return chart.to_dict()
+
+mortality_chart = figure_cache.get_or_build(
+    "life_expectancy/mortality", chart_state, build_mortality_chart,
+    depends={"indicators": ["child_mortality"], **chart_data}, generation=generation,
+)
+with stage("render"):
+    st.vega_lite_chart(mortality_chart)
 
 # Chart 2: Life Expectancy Trends
 st.subheader("Chart 2: Life Expectancy Trends")
@@ -66,13 +84,27 @@ Interestingly, the sharp rise in life expectancy in countries like China during
 mid-20th century reflects public health reforms and economic growth.
 """)
 
-expectancy_chart = alt.Chart(expectancy_melted).mark_line().encode(
-    x=alt.X("year:O", title="Year"),
-    y=alt.Y("Life Expectancy:Q", title="Life Expectancy at Birth"),
-    color="country:N"
-).properties(width=700, height=400)
+def build_expectancy_chart():
+    import altair as alt
+
+    with stage("filter"):
+        expectancy = pyramid.frame("life_expectancy", chart_state["countries"], year_range)
+        expectancy = expectancy.rename(columns={"life_expectancy": "Life Expectancy"})
+    with stage("chart"):
+        chart = alt.Chart(expectancy).mark_line().encode(
+            x=alt.X("year:Q", title="Year", axis=alt.Axis(format="d")),
+            y=alt.Y("Life Expectancy:Q", title="Life Expectancy at Birth"),
+            color="country:N"
+        ).properties(width=700, height=400)
+    with stage("serialize"):
+        return chart.to_dict()
 
-st.altair_chart(expectancy_chart)
+expectancy_chart = figure_cache.get_or_build(
+    "life_expectancy/expectancy", chart_state, build_expectancy_chart,
+    depends={"indicators": ["life_expectancy"], **chart_data}, generation=generation,
+)
+with stage("render"):
+    st.vega_lite_chart(expectancy_chart)
 
 # Chart 3: Child Mortality vs. Life Expectancy
 st.subheader("Chart 3: Child Mortality vs. Life Expectancy")
@@ -88,12 +120,29 @@ The trajectory of China’s data during the mid-20th century highlights a rapid
 likely due to systemic public health efforts.
 """)
 
-merged_data = pd.merge(mortality_melted, expectancy_melted, on=["country", "year"])
-scatter_chart = alt.Chart(merged_data).mark_circle(size=60).encode(
-    x=alt.X("Life Expectancy:Q", title="Life Expectancy at Birth"),
-    y=alt.Y("Child Mortality:Q", title="Child Mortality (0–5 years per 1000 births)"),
-    color="country:N",
-    tooltip=["country", "year", "Child Mortality", "Life Expectancy"]
-).properties(width=700, height=400)
+def build_scatter_chart():
+    import altair as alt
+
+    with stage("filter"):
+        trends = panel.frame(
+            ["child_mortality", "life_expectancy"], countries=chart_state["countries"], years=year_range
+        ).rename(columns={"child_mortality": "Child Mortality", "life_expectancy": "Life Expectancy"})
+    with stage("chart"):
+        chart = alt.Chart(trends).mark_circle(size=60).encode(
+            x=alt.X("Life Expectancy:Q", title="Life Expectancy at Birth"),
+            y=alt.Y("Child Mortality:Q", title="Child Mortality (0–5 years per 1000 births)"),
+            color="country:N",
+            tooltip=["country", "year", "Child Mortality", "Life Expectancy"]
+        ).properties(width=700, height=400)
+    # Every point is kept, so selecting all countries goes past Altair's 5000-row guard
+    with stage("serialize"):
+        return to_spec(chart)
+
+scatter_chart = figure_cache.get_or_build(
+    "life_expectancy/scatter", chart_state, build_scatter_chart,
+    depends={"indicators": ["child_mortality", "life_expectancy"], **chart_data}, generation=generation,
+)
+with stage("render"):
+    st.vega_lite_chart(scatter_chart)
 
-st.altair_chart(scatter_chart)
\ No newline at end of file
+finish_page()
@@ -1,28 +1,11 @@
 import streamlit as st
-import pandas as pd
-import altair as alt
 
-# Load data
-child_mortality_path = "child_mortality_0_5_year_olds_dying_per_1000_born.csv"
-population_path = "pop.csv"
+from observatory.debug import finish_page
+from observatory.preload import start_preload
+from observatory.tracing import stage, start_run
 
-child_mortality = pd.read_csv(child_mortality_path)
-population = pd.read_csv(population_path)
-
-# Data Cleaning
-def convert_population(value):
-    if isinstance(value, str):
-        if 'B' in value:
-            return float(value.replace('B', '')) * 1_000_000_000
-        elif 'M' in value:
-            return float(value.replace('M', '')) * 1_000_000
-        elif 'k' in value:
-            return float(value.replace('k', '')) * 1_000
-        else:
-            return float(value)
-    return value
-
-population.iloc[:, 1:] = population.iloc[:, 1:].applymap(convert_population)
+start_run("population")
+start_preload()
 
 # Title and Description
 st.title("Child Mortality Rate vs Population")
@@ -34,48 +17,65 @@ st.write("""
     Hovering over the chart provides tooltips with detailed information for each data point, including the year, population size, and child mortality rate.
 """)
 
+# Load data (population's "3.28M" strings are converted when the store is built)
+with stage("load"):
+    from observatory.downsample import get_pyramid
+    from observatory.figures import figure_cache
+    from observatory.panel import get_panel
+
+    generation = figure_cache.generation
+    panel = get_panel()
+    pyramid = get_pyramid()
+
 st.subheader("Select a Country")
-countries = sorted(child_mortality['country'].unique())
+countries = panel.countries_with("child_mortality")
 selected_country = st.selectbox("Country", countries, index=0)
 
-if selected_country:
-   
-    mortality_country = child_mortality[child_mortality['country'] == selected_country].melt(
-        id_vars='country', var_name='year', value_name='child_mortality'
-    )
-    population_country = population[population['country'] == selected_country].melt(
-        id_vars='country', var_name='year', value_name='population'
-    )
+def build_dual_axis_chart(country):
+    import altair as alt
 
-    merged_country_data = pd.merge(mortality_country, population_country, on=['country', 'year'], how='inner')
-    merged_country_data['year'] = merged_country_data['year'].astype(int)
-    merged_country_data = merged_country_data[merged_country_data['year'] % 20 == 0]
+    # Keep the min and max of each bucket of years so short spikes survive the thinning
+    with stage("filter"):
+        mortality_data = pyramid.frame("child_mortality", [country], max_points=60)
+        population_data = pyramid.frame("population", [country], max_points=60)
 
     # Dual-Y Axis Chart
-    dual_axis_chart = alt.layer(
-        # First Layer: Child Mortality
-        alt.Chart(merged_country_data).mark_line(point=True).encode(
-            x=alt.X('year:O', title='Year (Every 20 Years)', axis=alt.Axis(labelAngle=0)),
-            y=alt.Y('child_mortality:Q', title='Child Mortality Rate (per 1,000 live births)', axis=alt.Axis(titleColor='lightblue')),
-            tooltip=['year', 'child_mortality']
+    with stage("chart"):
+        chart = alt.layer(
+            # First Layer: Child Mortality
+            alt.Chart(mortality_data).mark_line(point=True).encode(
+                x=alt.X('year:Q', title='Year', axis=alt.Axis(labelAngle=0, format='d')),
+                y=alt.Y('child_mortality:Q', title='Child Mortality Rate (per 1,000 live births)', axis=alt.Axis(titleColor='lightblue')),
+                tooltip=['year', 'child_mortality']
+            ).properties(
+                width=800,
+                height=400,
+            ),
+            # Second Layer: Population
+            alt.Chart(population_data).mark_line(color='orange', point=True).encode(
+                x=alt.X('year:Q'),
+                y=alt.Y('population:Q', title='Population (in millions)', axis=alt.Axis(titleColor='orange')),
+                tooltip=['year', 'population']
+            )
+        ).resolve_scale(
+            y='independent'
         ).properties(
-            width=800,
-            height=400,
-        ),
-        # Second Layer: Population
-        alt.Chart(merged_country_data).mark_line(color='orange', point=True).encode(
-            x=alt.X('year:O'),
-            y=alt.Y('population:Q', title='Population (in millions)', axis=alt.Axis(titleColor='orange')),
-            tooltip=['year', 'population']
+            title=f" Child Mortality and Population Trends in {country}"
         )
-    ).resolve_scale(
-        y='independent'
-    ).properties(
-        title=f" Child Mortality and Population Trends in {selected_country}"
-    )
+    with stage("serialize"):
+        return chart.to_dict()
 
-    st.altair_chart(dual_axis_chart, use_container_width=True)
+if selected_country:
+    dual_axis_chart = figure_cache.get_or_build(
+        "population", {"country": selected_country}, lambda: build_dual_axis_chart(selected_country),
+        depends={"indicators": ["child_mortality", "population"], "countries": [selected_country]},
+        generation=generation,
+    )
+    with stage("render"):
+        st.vega_lite_chart(dual_axis_chart, use_container_width=True)
 
 st.write("""
 Initially, I planned to calculate the child mortality rate per population as a combined metric to represent both trends in one graph. However, this approach proved misleading because large populations could distort the results, masking the distinct trends of each metric. As a solution, I switched to a dual-axis chart, separating child mortality (per 1,000 live births) and population size (in millions) into independent axes. This made the comparison clearer, improved interpretability, and allowed for better interactivity and analysis of the two trends over time.
-""")
\ No newline at end of file
+""")
+
+finish_page()
@@ -1,29 +1,11 @@
-import pandas as pd
-import altair as alt
 import streamlit as st 
 
-# Load the data 
-child_mortality = pd.read_csv("https://huggingface.co/spaces/jiyachachan/fp2/resolve/main/child_mortality_0_5_year_olds_dying_per_1000_born.csv")  # Format: Country, Year, Value
-gdp_per_capita = pd.read_csv("https://huggingface.co/spaces/jiyachachan/fp2/resolve/main/gdp_pcap.csv")    # Format: Country, Year, Value
+from observatory.debug import finish_page
+from observatory.preload import start_preload
+from observatory.tracing import stage, start_run
 
-# Melt datasets to tidy format
-child_mortality = child_mortality.melt(id_vars=["country"], var_name="year", value_name="child_mortality")
-gdp_per_capita = gdp_per_capita.melt(id_vars=["country"], var_name="year", value_name="gdp_per_capita")
-
-# Merge the datasets
-merged_data = pd.merge(child_mortality, gdp_per_capita, on=["country", "year"])
-merged_data["year"] = merged_data["year"].astype(int)  # Ensure 'year' is an integer
-
-# Drop rows with missing or undefined country values
-merged_data = merged_data.dropna(subset=["country"])
-merged_data = merged_data[merged_data["country"] != "undefined"]
-
-# Convert gdp_per_capita and child_mortality to numeric
-merged_data["gdp_per_capita"] = pd.to_numeric(merged_data["gdp_per_capita"], errors="coerce")
-merged_data["child_mortality"] = pd.to_numeric(merged_data["child_mortality"], errors="coerce")
-
-# Drop rows with missing or invalid data
-merged_data = merged_data.dropna(subset=["gdp_per_capita", "child_mortality"])
+start_run("gdp")
+start_preload()
 
 # Streamlit app
 st.title("Interactive Visualization: GDP vs. Child Mortality")
@@ -34,38 +16,131 @@ st.text("The dataset represents global development indicators related to child m
 
 st.text(" ")
 
-# Filter data for a specific year
-year = st.slider("Select Year", min_value=int(merged_data["year"].min()), max_value=int(merged_data["year"].max()), value=2024)
-filtered_data = merged_data[merged_data["year"] == year]
+# Load the data: child mortality and GDP per capita on shared country/year axes
+with stage("load"):
+    import pandas as pd
 
-# Select number of countries to display
-num_countries = st.slider("Select Number of Countries to Display", min_value=5, max_value=50, value=30, step=5)
+    from observatory.charts import playback_scatter, playback_toggle, regression_trend, to_spec
+    from observatory.cube import get_cube
+    from observatory.figures import figure_cache
+    from observatory.stats import get_stats
 
-# Get top N countries by GDP per capita
-top_countries = filtered_data.nlargest(num_countries, "gdp_per_capita")
-
-# Create scatter plot with regression line
-scatter_plot = alt.Chart(top_countries).mark_circle(size=60).encode(
-    x=alt.X("gdp_per_capita:Q", scale=alt.Scale(type="log"), title="GDP per Capita (Log Scale)"),
-    y=alt.Y("child_mortality:Q", title="Child Mortality (per 1,000 live births)"),
-    color=alt.Color("country:N"),
-    tooltip=["country", "gdp_per_capita", "child_mortality"]
-).properties(
-    title=f"Relationship Between GDP Per Capita and Child Mortality ({year})",
-    width=800,
-    height=500
-)
+    generation = figure_cache.generation
+    cube = get_cube()
+    stats = get_stats()
+indicators = ["child_mortality", "gdp_per_capita"]
+min_year, max_year = cube.year_span(indicators)
 
-# Add regression line
-regression_line = scatter_plot.transform_regression(
-    "gdp_per_capita", "child_mortality", method="linear"
-).mark_line(color="red")
+play = playback_toggle()
 
-# Combine scatter plot and regression line
-final_chart = scatter_plot + regression_line
+# Filter data for a specific year (playback starts from the default one)
+year = 2024 if play else st.slider("Select Year", min_value=min_year, max_value=max_year, value=2024)
+
+# Select number of countries to display
+num_countries = st.slider("Select Number of Countries to Display", min_value=5, max_value=50, value=30, step=5)
+
+def build_gdp_chart(year, num_countries):
+    import altair as alt
+
+    # Get top N countries by GDP per capita from the precomputed ranking
+    with stage("filter"):
+        top_countries = stats.top_n("gdp_per_capita", year, num_countries, among=["child_mortality"])
+
+        # The regression line is fitted server-side on log GDP for the countries shown
+        fitted = stats.fitted_line(
+            "gdp_per_capita", "child_mortality", year,
+            top_countries["gdp_per_capita"].min(), top_countries["gdp_per_capita"].max(),
+            top=num_countries,
+        )
+
+    # Create scatter plot with regression line
+    with stage("chart"):
+        scatter_plot = alt.Chart(top_countries).mark_circle(size=60).encode(
+            x=alt.X("gdp_per_capita:Q", scale=alt.Scale(type="log"), title="GDP per Capita (Log Scale)"),
+            y=alt.Y("child_mortality:Q", title="Child Mortality (per 1,000 live births)"),
+            color=alt.Color("country:N"),
+            tooltip=["country", "gdp_per_capita", "child_mortality"]
+        ).properties(
+            title=f"Relationship Between GDP Per Capita and Child Mortality ({year})",
+            width=800,
+            height=500
+        )
+        regression_line = alt.Chart(fitted).mark_line(color="red").encode(
+            x="gdp_per_capita:Q",
+            y="child_mortality:Q",
+        )
+
+        # Combine scatter plot and regression line
+        chart = scatter_plot + regression_line
+    with stage("serialize"):
+        return chart.to_dict()
+
+def build_gdp_animation(num_countries, start_year):
+    # The top N of every year and their fitted lines, each in one pass
+    with stage("filter"):
+        years = range(min_year, max_year + 1)
+        top_countries = stats.top_n_frames("gdp_per_capita", num_countries, among=["child_mortality"], years=years)
+        x_range = top_countries.groupby("year")["gdp_per_capita"].agg(["min", "max"])
+        fitted = stats.fitted_lines("gdp_per_capita", "child_mortality", x_range, top=num_countries)
+
+    with stage("chart"):
+        chart = playback_scatter(
+            top_countries, "gdp_per_capita", "child_mortality", (min_year, max_year), start_year,
+            title="Relationship Between GDP Per Capita and Child Mortality ({year})",
+            x_title="GDP per Capita (Log Scale)",
+            y_title="Child Mortality (per 1,000 live births)",
+            tooltip=["country", "year", "gdp_per_capita", "child_mortality"],
+            line=fitted,
+            width=800,
+        )
+    with stage("serialize"):
+        return to_spec(chart)
+
+# Rendered charts are cached per year and top-N
+if play:
+    final_chart = figure_cache.get_or_build(
+        "gdp/play", {"year": year, "top_n": num_countries}, lambda: build_gdp_animation(num_countries, year),
+        depends={"indicators": indicators}, generation=generation,
+    )
+else:
+    final_chart = figure_cache.get_or_build(
+        "gdp", {"year": year, "top_n": num_countries}, lambda: build_gdp_chart(year, num_countries),
+        depends={"indicators": indicators, "years": [year]}, generation=generation,
+    )
 
 # Display chart in Streamlit
-st.altair_chart(final_chart, use_container_width=True)
+with stage("render"):
+    st.vega_lite_chart(final_chart, use_container_width=True)
+
+st.subheader("How the GDP-Mortality Relationship Changed Over Time")
+st.text("The red line above is a least-squares fit of child mortality on log10 GDP per capita for the countries shown. The chart below repeats that fit across every country with data, for every year: the slope is the change in child mortality per tenfold increase in GDP per capita, and R² shows how much of the variation between countries GDP explains.")
+
+def build_trend_chart(year):
+    with stage("filter"):
+        coefficients = stats.regression("gdp_per_capita", "child_mortality")
+    with stage("chart"):
+        chart = regression_trend(coefficients, year, width=800)
+    with stage("serialize"):
+        return chart.to_dict()
+
+trend_chart = figure_cache.get_or_build(
+    "gdp/trend", {"year": year}, lambda: build_trend_chart(year), depends={"indicators": indicators},
+    generation=generation,
+)
+with stage("render"):
+    st.vega_lite_chart(trend_chart)
+
+with stage("filter"):
+    fit = stats.regression("gdp_per_capita", "child_mortality").loc[year]
+st.text(f"{year}: slope {fit['slope']:.1f} per tenfold GDP, R² {fit['r2']:.2f}, {int(fit['n'])} countries.")
 
+with st.expander(f"Child mortality percentiles by region in {year}"):
+    with stage("filter"):
+        regional = stats.percentiles("child_mortality", by_region=True).xs(year, level="year")
+        worldwide = stats.percentiles("child_mortality").loc[[year]].rename(index={year: "World"})
+    with stage("render"):
+        st.dataframe(pd.concat([regional, worldwide]).round(1))
 
 st.text("To build the observatory, I began by preparing the dataset, which involved merging child mortality and GDP per capita data based on common fields: country and year. I ensured that the data was cleaned and formatted correctly, converting numerical fields like child_mortality and gdp_per_capita to numeric types and handling missing values by dropping rows with invalid entries. Once the data was ready, I created initial static visualizations using Altair to explore the relationship between GDP per capita and child mortality. The chart shows the relationship between GDP per capita and child mortality rates, highlighting an inverse trend where higher GDP per capita generally corresponds to lower child mortality. Building on this foundation, I added interactivity through Streamlit, allowing users to dynamically filter the dataset by year and select the number of countries to display. To enhance the visual analysis, I overlaid a regression line on the scatter plot, which provides a clear representation of trends. The app's functionality was refined iteratively, incorporating sliders for user interaction and tooltips for exploring country-specific data points.")
+
+finish_page()
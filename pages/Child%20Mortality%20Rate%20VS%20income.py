@@ -1,40 +1,115 @@
 import streamlit as st
-import pandas as pd
-import altair as alt
 
-income_df = pd.read_csv('https://huggingface.co/spaces/jiyachachan/fp2/resolve/main/mincpcap_cppp.csv')
-mortality_df = pd.read_csv('https://huggingface.co/spaces/jiyachachan/fp2/resolve/main/child_mortality_0_5_year_olds_dying_per_1000_born.csv')
+from observatory.debug import finish_page
+from observatory.preload import start_preload
+from observatory.tracing import stage, start_run
 
-income_long = pd.melt(income_df, id_vars=['country'], var_name='year', value_name='income')
-mortality_long = pd.melt(mortality_df, id_vars=['country'], var_name='year', value_name='mortality')
-
-income_long['year'] = income_long['year'].astype(int)
-mortality_long['year'] = mortality_long['year'].astype(int)
-
-yay = pd.merge(income_long, mortality_long, on=['country', 'year'])
-
-yer = yay.dropna()
-yer = yer[yer["year"] <= 2024]
+start_run("income")
+start_preload()
 
 st.title("Child Mortality vs Daily Income")
 
 st.text("From our earlier exploration of the data from part 1, we cleaned the data, where we removed around 2500 missing values which we deemed to not make a significant difference. Furthermore, we made sure to change the data appropriately such as changing the data type for the year into an integer. We also filtered the data so the max year is 2024, as the dataset included projected quantities for future years.")
 st.text("We examine child mortality deaths as our y-variable and daily income as our x-variable. The average daily income is the mean daily household per capita income. The mortality rate is the death of children under five years of age per 1000 live births. After cleaning the dataset, it contains 57195 rows × 4 columns with country, year, income, and mortality.")
-yeyear = st.slider("Select a Year", min_value=yer["year"].min(), max_value=2024, value=2024)
-
-filtered_yer = yer[yer["year"] == yeyear]
-
-scatter_plot = alt.Chart(filtered_yer).mark_circle(size=60).encode(
-    x=alt.X('income', title='Daily Income (USD)', scale=alt.Scale(type='log')),
-    y=alt.Y('mortality', title='Child Mortality (per 1,000)'),
-    color='country',
-    tooltip=['country', 'year', 'income', 'mortality']
-).properties(
-    width=700,
-    height=500,
-    title=f"Child Mortality vs Daily Income in {yeyear}"
+
+with stage("load"):
+    from observatory.charts import playback_scatter, playback_toggle, regression_trend, to_spec
+    from observatory.cube import get_cube
+    from observatory.figures import figure_cache
+    from observatory.panel import get_panel
+    from observatory.stats import get_stats
+
+    generation = figure_cache.generation
+    cube = get_cube()
+    panel = get_panel()
+    stats = get_stats()
+indicators = ["income", "child_mortality"]
+first_year = cube.year_span(indicators)[0]
+
+play = playback_toggle()
+yeyear = 2024 if play else st.slider("Select a Year", min_value=first_year, max_value=2024, value=2024)
+
+def build_income_chart(year):
+    import altair as alt
+
+    with stage("filter"):
+        filtered_yer = cube.joined_slice(indicators, year).rename(columns={"child_mortality": "mortality"})
+        filtered_yer.insert(1, "year", year)
+
+        # Fitted line from the precomputed per-year regression on log income
+        fitted = stats.fitted_line(
+            "income", "child_mortality", year, filtered_yer["income"].min(), filtered_yer["income"].max()
+        ).rename(columns={"child_mortality": "mortality"})
+
+    with stage("chart"):
+        scatter = alt.Chart(filtered_yer).mark_circle(size=60).encode(
+            x=alt.X('income', title='Daily Income (USD)', scale=alt.Scale(type='log')),
+            y=alt.Y('mortality', title='Child Mortality (per 1,000)'),
+            color='country',
+            tooltip=['country', 'year', 'income', 'mortality']
+        ).properties(
+            width=700,
+            height=500,
+            title=f"Child Mortality vs Daily Income in {year}"
+        )
+        line = alt.Chart(fitted).mark_line(color='red').encode(x='income', y='mortality')
+        chart = scatter + line
+
+    with stage("serialize"):
+        return chart.to_dict()
+
+def build_income_animation(start_year):
+    # Every year up to 2024 and its fitted line, each in one pass
+    with stage("filter"):
+        frames = panel.frame(indicators, years=(first_year, 2024), dropna="any").rename(
+            columns={"child_mortality": "mortality"}
+        )
+        x_range = frames.groupby("year")["income"].agg(["min", "max"])
+        fitted = stats.fitted_lines("income", "child_mortality", x_range).rename(columns={"child_mortality": "mortality"})
+
+    with stage("chart"):
+        chart = playback_scatter(
+            frames, "income", "mortality", (first_year, 2024), start_year,
+            title="Child Mortality vs Daily Income in {year}",
+            x_title="Daily Income (USD)",
+            y_title="Child Mortality (per 1,000)",
+            tooltip=["country", "year", "income", "mortality"],
+            line=fitted,
+        )
+    with stage("serialize"):
+        return to_spec(chart)
+
+if play:
+    scatter_plot = figure_cache.get_or_build(
+        "income/play", {"year": yeyear}, lambda: build_income_animation(yeyear),
+        depends={"indicators": indicators}, generation=generation,
+    )
+else:
+    scatter_plot = figure_cache.get_or_build(
+        "income", {"year": yeyear}, lambda: build_income_chart(yeyear),
+        depends={"indicators": indicators, "years": [yeyear]}, generation=generation,
+    )
+
+with stage("render"):
+    st.vega_lite_chart(scatter_plot, use_container_width=True)
+
+st.text("The red line is a least-squares fit of child mortality on log10 daily income across all countries for the selected year. The chart below shows how the slope of that fit (the change in child mortality per tenfold increase in income) and its R² have moved over time.")
+
+def build_trend_chart(year):
+    with stage("filter"):
+        coefficients = stats.regression("income", "child_mortality").loc[:2024]
+    with stage("chart"):
+        chart = regression_trend(coefficients, year)
+    with stage("serialize"):
+        return chart.to_dict()
+
+trend_chart = figure_cache.get_or_build(
+    "income/trend", {"year": yeyear}, lambda: build_trend_chart(yeyear), depends={"indicators": indicators},
+    generation=generation,
 )
+with stage("render"):
+    st.vega_lite_chart(trend_chart)
 
-st.altair_chart(scatter_plot, use_container_width=True)
+st.text("In Streamlit, we create an interactive slider that allows the user to choose a year where the earliest year is 1800 and the maximum year is 2024. In Altair, we create a scatter plot where the x-axis is represented by daily income (USD) set to a logarithmic scale for better visualization for larger income ranges, and the y-axis is represented by child mortality (per 1,000). Each country is assigned a unique color and we incorporate a hover tooltip to show the country, year, income, and mortality rate for a specific data point.")
 
-st.text("In Streamlit, we create an interactive slider that allows the user to choose a year where the earliest year is 1800 and the maximum year is 2024. In Altair, we create a scatter plot where the x-axis is represented by daily income (USD) set to a logarithmic scale for better visualization for larger income ranges, and the y-axis is represented by child mortality (per 1,000). Each country is assigned a unique color and we incorporate a hover tooltip to show the country, year, income, and mortality rate for a specific data point.")
\ No newline at end of file
+finish_page()
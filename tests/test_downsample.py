@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from observatory.downsample import Pyramid
+from observatory.store import DTYPE, IndicatorStore, widen
+
+NAME = "life_expectancy"
+
+
+@pytest.fixture
+def pyramid():
+    rng = np.random.default_rng(0)
+    matrix = rng.uniform(20, 80, size=(40, 301)).astype(DTYPE)
+    matrix[rng.random(matrix.shape) < 0.1] = np.nan
+    countries = [f"Country {i:02d}" for i in range(len(matrix))]
+    return Pyramid(IndicatorStore(countries, np.arange(1800, 2101), {NAME: matrix}))
+
+
+@pytest.mark.parametrize("years", [(1800, 2100), (1900, 2024), (1910, 1930), (1903, 1937), (1917, 1919)])
+def test_extremes_survive_downsampling(pyramid, years):
+    frame = pyramid.frame(NAME, pyramid.countries, years, max_points=400)
+    assert frame.attrs["bucket_size"] > 1 or years[1] - years[0] < 10
+    assert frame["year"].between(*years).all()
+
+    first, last = np.searchsorted(pyramid.years, years[0]), np.searchsorted(pyramid.years, years[1])
+    values = widen(pyramid.store.matrix(NAME)[:, first:last + 1])
+    expected = pd.DataFrame({"min": np.nanmin(values, axis=1), "max": np.nanmax(values, axis=1)},
+                            index=pd.Index(pyramid.countries, name="country"))
+    drawn = frame.groupby("country")[NAME].agg(["min", "max"])
+    pd.testing.assert_frame_equal(drawn, expected.loc[drawn.index])
+
+
+def test_range_outside_the_axis_is_empty(pyramid):
+    assert pyramid.frame(NAME, pyramid.countries, (1790, 1795)).empty
+    assert pyramid.frame(NAME, pyramid.countries, (2200, 2300)).empty
+    assert pyramid.frame(NAME, pyramid.countries, (1790, 1800))["year"].unique().tolist() == [1800]
@@ -0,0 +1,102 @@
+import hashlib
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from observatory import cube, downsample, loader, panel, refresh, stats, store
+from observatory.figures import FigureCache
+from observatory.parsing import numeric_table
+
+NAME = "life_expectancy"
+CSV = b"country,2000,2001\nChad,40,41\nSweden,79,80\n"
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    """A one-indicator data directory and the in-memory store built from it."""
+    monkeypatch.setattr(loader, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(loader, "INDICATORS", {NAME: "life.csv"})
+    path = tmp_path / "life.csv"
+
+    def write(raw):
+        path.write_bytes(raw)
+        # Older than SETTLE_SECONDS, so the refresher does not wait for it
+        settled = time.time() - 10 * refresh.SETTLE_SECONDS
+        os.utime(path, (settled, settled))
+
+    write(CSV)
+    table, unparsed = numeric_table(pd.read_csv(path))
+    current = store.IndicatorStore(
+        table.index, table.columns, {NAME: table.to_numpy(dtype=store.DTYPE)},
+        unparsed={NAME: unparsed}, sources={NAME: hashlib.sha256(CSV).hexdigest()},
+    )
+    monkeypatch.setattr(store, "_open", current)
+    for module, attribute in ((cube, "_cube"), (panel, "_panel"), (stats, "_stats"), (downsample, "_pyramid")):
+        monkeypatch.setattr(module, attribute, None)
+    return write
+
+
+def test_changed_value_is_applied_in_place(source):
+    refresher = refresh.Refresher()
+    assert not refresher.refresh(remote=False)
+
+    source(CSV.replace(b"Sweden,79,80", b"Sweden,79,81"))
+    changes = refresher.refresh(remote=False)
+
+    assert changes.cells == {NAME: (frozenset({"Sweden"}), frozenset({2001}))}
+    assert not changes.axes_changed
+    refreshed = store.open_store()
+    assert refreshed.matrix(NAME)[refreshed.countries.get_loc("Sweden")].tolist() == [79, 81]
+
+
+def test_new_year_and_country_widen_the_axes(source):
+    refresher = refresh.Refresher()
+    refresher.refresh(remote=False)
+
+    source(b"country,2000,2001,2002\nChad,40,41,42\nSweden,79,80,81\n")
+    changes = refresher.refresh(remote=False)
+    assert bool(changes) is True
+    assert changes.axes_changed
+    refreshed = store.open_store()
+    assert refreshed.years.tolist() == [2000, 2001, 2002]
+    assert refreshed.matrix(NAME)[:, -1].tolist() == [42, 81]
+
+    source(b"country,2000,2001,2002\nChad,40,41,42\nNorway,78,79,x\nSweden,79,80,81\n")
+    changes = refresher.refresh(remote=False)
+    assert changes.axes_changed
+    refreshed = store.open_store()
+    assert list(refreshed.countries) == ["Chad", "Norway", "Sweden"]
+    np.testing.assert_array_equal(refreshed.matrix(NAME)[1], [78, 79, np.nan])
+    assert refreshed.unparsed[NAME] == 1
+    # Nothing left over for the next poll
+    assert not refresher.refresh(remote=False)
+
+
+def test_spec_drawn_before_a_swap_is_not_cached(source, monkeypatch):
+    figures = FigureCache(prewarm=True)
+    monkeypatch.setattr(refresh, "figure_cache", figures)
+    refresher = refresh.Refresher()
+    refresher.refresh(remote=False)
+
+    # A page reads the generation and fetches the cube, then a refresh lands before it builds
+    generation = figures.generation
+    fetched = cube.get_cube()
+    source(CSV.replace(b"Sweden,79,80", b"Sweden,79,81"))
+    assert refresher.refresh(remote=False)
+
+    def build(state=None):
+        return {"sweden": fetched.year_slice(NAME, 2001)["Sweden"].item()}
+
+    spec = figures.get_or_build("page", {}, build, depends={"indicators": [NAME]}, generation=generation)
+    assert spec == {"sweden": 80}
+    assert figures.get("page", {}) is None
+    figures.prewarm("page", [{}], build, background=False, generation=generation)
+    assert figures.get("page", {}) is None
+
+    generation = figures.generation
+    fetched = cube.get_cube()
+    figures.get_or_build("page", {}, build, depends={"indicators": [NAME]}, generation=generation)
+    assert figures.get("page", {}) == {"sweden": 81}